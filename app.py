@@ -5,7 +5,6 @@ import os
 import uuid
 import threading
 import time
-import json
 
 app = Flask(__name__)
 
@@ -63,16 +62,9 @@ def favorites(username):
     completed_slide_dates = []
     
     try:
-        from batch_processor import JOBS_FILE
-        bp = BatchProcessor()
-        if os.path.exists(JOBS_FILE):
-            with open(JOBS_FILE, 'r') as f:
-                jobs = json.load(f)
-                for job_id, info in jobs.items():
-                    if info['status'] == 'RUNNING' and \
-                       info['metadata'].get('type') == 'slide' and \
-                       info['metadata'].get('user') == username:
-                        active_job_dates.append(info['metadata'].get('date'))
+        from job_store import JobStore
+        for job_id, info in JobStore().find(job_type='slide', user=username, status='RUNNING'):
+            active_job_dates.append(info['metadata'].get('date'))
         
         # Check for existing PDF files
         output_dir = os.path.join(storage.USERS_DIR, username, 'slides')
@@ -169,6 +161,24 @@ def background_generate_slides(username, date_str, papers, output_path, status_k
         GENERATION_STATUS[status_key]['status'] = 'error'
         GENERATION_STATUS[status_key]['error_msg'] = str(e)
 
+def background_submit_slide_batch(username, date_str, papers, status_key):
+    """Prepares (download + render) and submits a slide batch off the request thread."""
+    def report(done, total):
+        GENERATION_STATUS[status_key]['progress'] = f"Preparing {done}/{total}" if done < total else "Uploading"
+
+    try:
+        extractor = slide_generator.SlideContentExtractor()
+        job_id = BatchProcessor().submit_slide_batch(username, date_str, papers, extractor, progress=report)
+        if job_id:
+            GENERATION_STATUS[status_key]['progress'] = 'Batch Submitted (Up to 24h)'
+        else:
+            GENERATION_STATUS[status_key]['status'] = 'error'
+            GENERATION_STATUS[status_key]['error_msg'] = 'Failed to submit batch job'
+    except Exception as e:
+        print(f"Slide batch generation error: {e}")
+        GENERATION_STATUS[status_key]['status'] = 'error'
+        GENERATION_STATUS[status_key]['error_msg'] = str(e)
+
 from batch_processor import BatchProcessor
 
 @app.route('/api/u/<username>/generate_slides', methods=['POST'])
@@ -216,18 +226,13 @@ def generate_slides(username):
             GENERATION_STATUS[status_key] = {'status': 'running', 'progress': 'Batch Submitted (Up to 24h)'}
             return jsonify({'status': 'processing', 'progress': 'Batch job already in progress'})
 
-        # Submit to Batch API
-        try:
-            extractor = slide_generator.SlideContentExtractor()
-            job_id = bp.submit_slide_batch(username, date_str, target_papers, extractor)
-            if job_id:
-                GENERATION_STATUS[status_key] = {'status': 'running', 'progress': 'Batch Submitted (Up to 24h)'}
-                return jsonify({'status': 'started', 'mode': 'batch'})
-            else:
-                return jsonify({'status': 'error', 'message': 'Failed to submit batch job'}), 500
-        except Exception as e:
-            print(f"Slide batch generation error: {e}")
-            return jsonify({'status': 'error', 'message': str(e)}), 500
+        # Prepare and submit to Batch API in the background; poll generation_status for progress
+        GENERATION_STATUS[status_key] = {'status': 'running', 'progress': 'Preparing 0/%d' % len(target_papers)}
+        thread = threading.Thread(target=background_submit_slide_batch, args=(username, date_str, target_papers, status_key))
+        thread.start()
+
+        return jsonify({'status': 'started', 'mode': 'batch',
+                        'status_url': url_for('generation_status', username=username, date_str=date_str)})
     else:
         # Start background thread (Fast mode)
         GENERATION_STATUS[status_key] = {'status': 'running', 'progress': '0/%d' % len(target_papers)}
@@ -253,6 +258,26 @@ def generation_status(username, date_str):
         
     return jsonify(info)
 
+@app.route('/api/storage/cache_stats')
+def storage_cache_stats():
+    return jsonify(storage.cache_stats())
+
+@app.route('/api/date/<date_str>/papers')
+def date_papers(date_str):
+    offset = request.args.get('offset', 0, type=int)
+    limit = min(request.args.get('limit', 20, type=int), 200)
+    papers, total = storage.load_papers_page(date_str, offset, limit)
+    if papers is None:
+        abort(404)
+    return jsonify({'date': date_str, 'offset': offset, 'total': total, 'papers': papers})
+
+@app.route('/api/date/<date_str>/paper/<paper_id>')
+def date_paper(date_str, paper_id):
+    paper = storage.load_paper(date_str, paper_id)
+    if paper is None:
+        abort(404)
+    return jsonify(paper)
+
 @app.route('/u/<username>/download_slides/<filename>')
 def download_slides(username, filename):
     file_path = os.path.join(storage.USERS_DIR, username, 'slides', filename)
@@ -1,9 +1,14 @@
 import os
 import json
 import time
-from google import genai
-from google.genai import types
+import shutil
 import logging
+import tempfile
+import concurrent.futures
+import llm_backend
+import summary_cache
+from rate_limiter import estimate_tokens
+from job_store import JobStore
 
 # Configure logging
 LOG_DIR = os.path.join(os.path.dirname(__file__), 'logs')
@@ -16,125 +21,56 @@ logging.basicConfig(
     format='%(asctime)s [%(levelname)s] %(message)s'
 )
 
-JOBS_FILE = os.path.join(os.path.dirname(__file__), 'data', 'batch_jobs.json')
-
-class BatchProcessor:
-    def __init__(self, api_key=None):
-        self.api_key = api_key or os.environ.get("GEMINI_API_KEY")
-        if not self.api_key:
-            raise ValueError("GEMINI_API_KEY is required.")
-        self.client = genai.Client(api_key=self.api_key, http_options={'api_version': 'v1beta'})
-
-    def is_job_running(self, job_type, date_str, user=None):
-        """Checks if a job of a certain type, date and optionally user is already running."""
-        if not os.path.exists(JOBS_FILE):
-            return False
-        try:
-            with open(JOBS_FILE, 'r') as f:
-                jobs = json.load(f)
-            for info in jobs.values():
-                if info['status'] == 'RUNNING' and \
-                   info['metadata'].get('type') == job_type and \
-                   info['metadata'].get('date') == date_str:
-                    
-                    # If user is specified, check it too
-                    if user and info['metadata'].get('user') != user:
-                        continue
-                        
-                    return True
-        except:
-            return False
-        return False
-
-    def _save_job_info(self, job_id, metadata):
-        jobs = {}
-        if os.path.exists(JOBS_FILE):
-            with open(JOBS_FILE, 'r') as f:
-                try:
-                    jobs = json.load(f)
-                except json.JSONDecodeError:
-                    jobs = {}
-        
-        jobs[job_id] = {
-            "status": "RUNNING",
-            "created_at": time.time(),
-            "metadata": metadata # {type: 'summary'|'slide', date: ..., user: ...}
-        }
-        
-        with open(JOBS_FILE, 'w') as f:
-            json.dump(jobs, f, indent=2)
-
-    def submit_summary_batch(self, date_str, papers):
-        """Submits a batch job for paper summaries using OpenAI compatible format."""
-        requests = []
-        for p in papers:
-            prompt = f"""
-You are an expert researcher. Read the following paper title and abstract, then provide a Japanese summary.
-Title: {p['title']}
-Abstract: {p['abstract']}
+# Request files are streamed here and split into several batch jobs
+# (one logical job) once a shard reaches either limit
+BATCH_TMP_DIR = os.environ.get("BATCH_TMP_DIR") # None: system temp directory
+BATCH_SHARD_MAX_BYTES = int(os.environ.get("BATCH_SHARD_MAX_BYTES", str(500 * 1024 * 1024)))
+BATCH_SHARD_MAX_REQUESTS = int(os.environ.get("BATCH_SHARD_MAX_REQUESTS", "5000"))
+
+# Slide batch preparation: concurrent PDF downloads, page rendering in worker processes
+SLIDE_DOWNLOAD_CONCURRENCY = int(os.environ.get("SLIDE_DOWNLOAD_CONCURRENCY", "4"))
+SLIDE_RENDER_PROCESSES = int(os.environ.get("SLIDE_RENDER_PROCESSES", str(min(4, os.cpu_count() or 1))))
+SLIDE_PREPARE_WINDOW = SLIDE_DOWNLOAD_CONCURRENCY + SLIDE_RENDER_PROCESSES
+
+# Downloaded job outputs, kept until the job is processed
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'data', 'batch_results')
+# Summary results applied (and the job's cursor advanced) per journal append
+RESULT_CHUNK_SIZE = int(os.environ.get("BATCH_RESULT_CHUNK_SIZE", "100"))
+
+# Status polling (check_jobs). Every RUNNING job has its own next poll time:
+# rarely right after submission, more often as it nears the batch deadline.
+POLL_CONCURRENCY = int(os.environ.get("BATCH_POLL_CONCURRENCY", "8"))
+POLL_MIN_INTERVAL = float(os.environ.get("BATCH_POLL_MIN_INTERVAL", "60"))
+POLL_MAX_INTERVAL = float(os.environ.get("BATCH_POLL_MAX_INTERVAL", "1800"))
+POLL_TIMEOUT = float(os.environ.get("BATCH_POLL_TIMEOUT", "30"))
+BATCH_JOB_DEADLINE = float(os.environ.get("BATCH_JOB_DEADLINE_HOURS", "24")) * 3600
+
+def next_poll_delay(age, state=None):
+    """Seconds until a job `age` seconds old, last seen in `state`, should be polled again."""
+    remaining = max(BATCH_JOB_DEADLINE - age, 0.0)
+    delay = remaining / 16
+    if state is None or 'PENDING' in state or 'QUEUED' in state:
+        delay *= 2 # Not started yet (or poll failed); no result is imminent
+    return min(max(delay, POLL_MIN_INTERVAL), POLL_MAX_INTERVAL)
+
+# Fixed instructions are sent as the system message of every request, ahead
+# of the paper-specific user message, so identical prefixes can be served
+# from the API's implicit context cache
+SUMMARY_SYSTEM_INSTRUCTION = """
+You are an expert researcher. Read the paper title and abstract given by the user, then provide a Japanese summary.
 
 CRITICAL INSTRUCTIONS:
 1. Respond ONLY with a valid JSON object.
 2. DO NOT use any Markdown formatting (like **, ###, *, -, etc.) inside the text values. The output must be plain text suitable for Text-to-Speech reading.
 
 JSON Schema:
-{{
+{
     "summary_ja": "A concise Japanese summary of the abstract (plain text, 3-4 sentences).",
     "contribution_ja": "A one-sentence statement of the main contribution or novelty in Japanese (plain text)."
-}}
+}
 """
-            # Construct OpenAI-compatible JSONL request format
-            req = {
-                "custom_id": p['id'],
-                "method": "POST",
-                "url": "/v1/chat/completions",
-                "body": {
-                    "model": "gemini-3-flash-preview",
-                    "messages": [
-                        {"role": "user", "content": prompt}
-                    ],
-                    "response_format": {"type": "json_object"}
-                }
-            }
-            requests.append(req)
-
-        # Write to temp file
-        temp_file = f"batch_summary_{date_str}.jsonl"
-        with open(temp_file, 'w') as f:
-            for req in requests:
-                f.write(json.dumps(req) + '\n')
-
-        # Upload and submit
-        print(f"Uploading {temp_file}...")
-        # argument name is 'file' and we specify mime_type
-        try:
-            gfile = self.client.files.upload(
-                file=temp_file,
-                config={'mime_type': 'application/jsonl'}
-            )
-            
-            job = self.client.batches.create(
-                model='models/gemini-3-flash-preview',
-                src=gfile.name
-            )
-            
-            print(f"Batch job submitted: {job.name}")
-            self._save_job_info(job.name, {"type": "summary", "date": date_str})
-            os.remove(temp_file)
-            return job.name
-        except Exception as e:
-            logging.error(f"Error submitting summary batch: {e}")
-            if os.path.exists(temp_file):
-                os.remove(temp_file)
-            raise e
 
-    def submit_slide_batch(self, username, date_str, papers, extractor):
-        """Submits a batch job for slide content extraction."""
-        import base64
-        import io
-        requests = []
-        for p in papers:
-            prompt = """
+SLIDE_BATCH_PROMPT = """
 You are an expert Computer Vision researcher creating a high-quality technical presentation slide for a paper reading session (Journal Club).
 Please read the paper deeply and extract the following information in JAPANESE.
 
@@ -166,194 +102,462 @@ CRITICAL:
 - figure2: Must be a RESULT comparison or Qualitative example.
 - bbox: [0-1000] scale.
 """
-            
-            url = p.get('url')
-            if not url: continue
-            
-            try:
-                # We need to download and convert to images to send to Batch API
-                pdf_stream = extractor._download_pdf(url)
-                images, _ = extractor._pdf_to_images(pdf_stream, num_pages=4)
-                
-                contents = [{"type": "text", "text": prompt}]
-                for img in images:
-                    buffered = io.BytesIO()
-                    img.save(buffered, format="JPEG", quality=80)
-                    img_str = base64.b64encode(buffered.getvalue()).decode()
-                    contents.append({
-                        "type": "image_url", 
-                        "image_url": {"url": f"data:image/jpeg;base64,{img_str}"}
-                    })
-                
-                req = {
-                    "custom_id": p['id'],
-                    "method": "POST",
-                    "url": "/v1/chat/completions",
-                    "body": {
-                        "model": "gemini-3-flash-preview",
-                        "messages": [{"role": "user", "content": contents}],
-                        "response_format": {"type": "json_object"}
-                    }
-                }
-                requests.append(req)
-            except Exception as e:
-                logging.error(f"Error preparing slide batch for {url}: {e}")
-
-        if not requests:
-            logging.error("No valid requests generated for slide batch.")
+
+def write_request_shards(requests, directory, prefix):
+    """
+    Streams request dicts into JSONL files under `directory`, starting a new
+    shard before one would exceed BATCH_SHARD_MAX_BYTES or
+    BATCH_SHARD_MAX_REQUESTS. Returns [(path, request_count)].
+    """
+    shards = []
+    f = None
+    try:
+        for req in requests:
+            line = (json.dumps(req) + '\n').encode('utf-8')
+            if f is None or count >= BATCH_SHARD_MAX_REQUESTS or size + len(line) > BATCH_SHARD_MAX_BYTES:
+                if f is not None:
+                    f.close()
+                path = os.path.join(directory, f"{prefix}_{len(shards):03d}.jsonl")
+                f = open(path, 'wb')
+                shards.append([path, 0])
+                size = count = 0
+            f.write(line)
+            size += len(line)
+            count += 1
+            shards[-1][1] = count
+    finally:
+        if f is not None:
+            f.close()
+    return [tuple(shard) for shard in shards]
+
+def _poll(backend, job_id):
+    start = time.monotonic()
+    job = backend.get_batch(job_id)
+    return job, time.monotonic() - start
+
+class BatchProcessor:
+    def __init__(self, api_key=None, job_store=None):
+        self.backend = llm_backend.get_backend(api_key)
+        self.jobs = job_store or JobStore()
+
+    def is_job_running(self, job_type, date_str, user=None):
+        """Checks if a job of a certain type, date and optionally user is already running."""
+        try:
+            return self.jobs.is_running(job_type, date_str, user)
+        except Exception as e:
+            logging.error(f"Error checking running jobs: {e}")
+            return False
+
+    def _save_job_info(self, job_id, metadata, group_id=None):
+        # metadata: {type: 'summary'|'slide', date: ..., user: ...}
+        # A fresh job has no result imminent, so its first poll is scheduled like any other
+        self.jobs.add(job_id, metadata, group_id=group_id, next_poll_at=time.time() + next_poll_delay(0))
+
+    def _submit_shards(self, shards, metadata, label):
+        """
+        Uploads each shard and starts one batch job per shard. All shards
+        share a group id (the first job's name), which is returned as the
+        logical job id.
+        """
+        group_id = None
+        for i, (path, count) in enumerate(shards):
+            print(f"Uploading {label} shard {i + 1}/{len(shards)} ({count} requests)...")
+            src = self.backend.upload_file(path, 'application/jsonl')
+            job = self.backend.create_batch('gemini-3-flash-preview', src)
+            group_id = group_id or job.name
+            print(f"{label} job submitted: {job.name}")
+            self._save_job_info(job.name, dict(metadata, shard=i, shards=len(shards)), group_id=group_id)
+        return group_id
+
+    @staticmethod
+    def _summary_payload(p):
+        # Only the paper itself; the instructions are the shared system message
+        return f"Title: {p['title']}\nAbstract: {p['abstract']}"
+
+    def _summary_request(self, p):
+        payload = self._summary_payload(p)
+        # Construct OpenAI-compatible JSONL request format
+        return {
+            "custom_id": p['id'],
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": {
+                "model": "gemini-3-flash-preview",
+                "messages": [
+                    {"role": "system", "content": SUMMARY_SYSTEM_INSTRUCTION},
+                    {"role": "user", "content": payload}
+                ],
+                "response_format": {"type": "json_object"}
+            }
+        }
+
+    @staticmethod
+    def _request_token_stats(label, shards, instructions, payload_tokens=0):
+        """
+        Estimated text input tokens per request with the instructions inline
+        (as before) versus paper-specific only, printed and returned for the
+        job metadata.
+        """
+        count = sum(n for _, n in shards)
+        if not count:
+            return {}
+        instruction_tokens = estimate_tokens(instructions)
+        stats = {
+            "requests": count,
+            "inline_tokens_per_request": round(instruction_tokens + payload_tokens / count),
+            "payload_tokens_per_request": round(payload_tokens / count),
+            "system_instruction_tokens": instruction_tokens,
+        }
+        msg = (f"{label}: {count} requests, ~{stats['inline_tokens_per_request']} text tokens/request with inline "
+               f"instructions -> ~{stats['payload_tokens_per_request']} paper-specific tokens/request "
+               f"+ {instruction_tokens} shared system instruction tokens")
+        print(msg)
+        logging.info(msg)
+        return stats
+
+    def submit_summary_batch(self, date_str, papers):
+        """
+        Submits a batch job for paper summaries using OpenAI compatible format.
+        Papers found in the summary cache are filled in place and not sent;
+        returns None when no paper is left to send.
+        """
+        papers = summary_cache.apply_cached(papers, source='batch')
+        # Like the sync path, papers without an abstract are not sent
+        skipped = [p.get('id') for p in papers if not p.get('abstract')]
+        if skipped:
+            logging.info(f"Skipping {len(skipped)} papers without an abstract: {skipped}")
+            papers = [p for p in papers if p.get('abstract')]
+        if not papers:
+            print("No papers left to summarize (cached or without an abstract). No batch job needed.")
             return None
 
-        # Write to temp file
-        temp_file = f"batch_slide_{username}_{date_str}.jsonl"
-        with open(temp_file, 'w') as f:
-            for req in requests:
-                f.write(json.dumps(req) + '\n')
+        workdir = tempfile.mkdtemp(prefix='batch_summary_', dir=BATCH_TMP_DIR)
+        try:
+            shards = write_request_shards((self._summary_request(p) for p in papers), workdir, f"batch_summary_{date_str}")
+            payload_tokens = sum(estimate_tokens(self._summary_payload(p)) for p in papers)
+            tokens = self._request_token_stats("Summary batch", shards, SUMMARY_SYSTEM_INSTRUCTION, payload_tokens)
+            return self._submit_shards(shards, {"type": "summary", "date": date_str, "tokens": tokens}, "Summary batch")
+        except Exception as e:
+            logging.error(f"Error submitting summary batch: {e}")
+            raise e
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    @staticmethod
+    def _slide_request(paper_id, pages):
+        contents = []
+        for img_str in pages:
+            contents.append({
+                "type": "image_url", 
+                "image_url": {"url": f"data:image/jpeg;base64,{img_str}"}
+            })
+        return {
+            "custom_id": paper_id,
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": {
+                "model": "gemini-3-flash-preview",
+                "messages": [
+                    {"role": "system", "content": SLIDE_BATCH_PROMPT},
+                    {"role": "user", "content": contents}
+                ],
+                "response_format": {"type": "json_object"}
+            }
+        }
 
-        print(f"Uploading slide batch {temp_file}...")
+    def _slide_requests(self, papers, extractor, progress=None):
+        """
+        Yields one request per paper. PDFs are downloaded on a thread pool and
+        pages are rasterized and encoded on a process pool; at most
+        SLIDE_PREPARE_WINDOW papers are in flight, so memory stays bounded.
+        `progress(done, total)` is called as each paper finishes.
+        """
+        import multiprocessing
+        import slide_generator
+        papers = [p for p in papers if p.get('url')]
+
+        def prepare(p):
+            # Rendered pages are kept in page_cache for cropping figures once the job completes
+            key = slide_generator.page_cache_key(p['id'])
+            pages = slide_generator.page_cache.get(key)
+            if pages is None:
+                # We need to download and convert to images to send to Batch API
+                pdf_bytes = extractor._download_pdf(p['url']).getvalue()
+                pages = renderers.submit(slide_generator.render_pages_jpeg, pdf_bytes, 4).result()
+                slide_generator.page_cache.put(key, pages)
+            return self._slide_request(p['id'], pages)
+
+        renderers = concurrent.futures.ProcessPoolExecutor(
+            max_workers=SLIDE_RENDER_PROCESSES, mp_context=multiprocessing.get_context('spawn'))
+        downloads = concurrent.futures.ThreadPoolExecutor(max_workers=SLIDE_DOWNLOAD_CONCURRENCY)
         try:
-            gfile = self.client.files.upload(
-                file=temp_file,
-                config={'mime_type': 'application/jsonl'}
-            )
-            
-            job = self.client.batches.create(
-                model='models/gemini-3-flash-preview',
-                src=gfile.name
-            )
-            
-            print(f"Slide Batch job submitted: {job.name}")
-            self._save_job_info(job.name, {"type": "slide", "date": date_str, "user": username})
-            os.remove(temp_file)
-            return job.name
+            queue = iter(papers)
+            pending = {}
+            done_count = 0
+            while True:
+                while len(pending) < SLIDE_PREPARE_WINDOW:
+                    p = next(queue, None)
+                    if p is None:
+                        break
+                    pending[downloads.submit(prepare, p)] = p
+                if not pending:
+                    break
+                done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    p = pending.pop(future)
+                    done_count += 1
+                    if progress:
+                        progress(done_count, len(papers))
+                    try:
+                        yield future.result()
+                    except Exception as e:
+                        logging.error(f"Error preparing slide batch for {p['url']}: {e}")
+        finally:
+            downloads.shutdown(wait=True, cancel_futures=True)
+            renderers.shutdown(wait=True, cancel_futures=True)
+
+    def submit_slide_batch(self, username, date_str, papers, extractor, progress=None):
+        """
+        Submits a batch job for slide content extraction. `progress(done, total)`
+        reports how many papers have been prepared.
+        """
+        workdir = tempfile.mkdtemp(prefix='batch_slide_', dir=BATCH_TMP_DIR)
+        try:
+            shards = write_request_shards(self._slide_requests(papers, extractor, progress), workdir,
+                                          f"batch_slide_{username}_{date_str}")
+            if not shards:
+                logging.error("No valid requests generated for slide batch.")
+                return None
+            # The user message holds only the page images
+            tokens = self._request_token_stats("Slide batch", shards, SLIDE_BATCH_PROMPT)
+            return self._submit_shards(shards, {"type": "slide", "date": date_str, "user": username, "tokens": tokens},
+                                       "Slide batch")
         except Exception as e:
             logging.error(f"Error submitting slide batch: {e}")
-            if os.path.exists(temp_file):
-                os.remove(temp_file)
             raise e
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
 
     def check_jobs(self):
-        """Checks all active jobs and updates state."""
-        if not os.path.exists(JOBS_FILE):
-            return
-            
-        with open(JOBS_FILE, 'r') as f:
-            try:
-                jobs = json.load(f)
-            except:
-                return
-            
-        updated = False
-        for job_id, info in list(jobs.items()):
-            if info['status'] == 'COMPLETED' or info['status'] == 'FAILED':
-                continue
-                
-            try:
-                job = self.client.batches.get(name=job_id)
+        """
+        Polls every active job whose next poll time has come, concurrently,
+        and updates state. Polls still unanswered after POLL_TIMEOUT are
+        rescheduled with a backed-off delay instead of holding up the caller.
+        """
+        due = self.jobs.due_for_poll()
+        if due:
+            executor = concurrent.futures.ThreadPoolExecutor(max_workers=min(POLL_CONCURRENCY, len(due)))
+            futures = {executor.submit(_poll, self.backend, job_id): (job_id, info) for job_id, info in due}
+            done, pending = concurrent.futures.wait(futures, timeout=POLL_TIMEOUT)
+            executor.shutdown(wait=False, cancel_futures=True)
+
+            for future in done:
+                job_id, info = futures[future]
+                age = time.time() - info['created_at']
+                try:
+                    job, latency = future.result()
+                except Exception as e:
+                    logging.error(f"Error checking job {job_id}: {e}")
+                    self.jobs.record_poll(job_id, 'ERROR', None, time.time() + next_poll_delay(age))
+                    continue
+
                 state_str = str(job.state)
+                self.jobs.record_poll(job_id, state_str, latency, time.time() + next_poll_delay(age, state_str))
                 if 'SUCCEEDED' in state_str:
-                    print(f"Job {job_id} succeeded!")
-                    info['status'] = 'COMPLETED'
-                    info['completed_at'] = time.time()
-                    info['output_uri'] = job.dest.file_name
-                    updated = True
+                    if self.jobs.transition(job_id, 'RUNNING', 'COMPLETED',
+                                            completed_at=time.time(), output_uri=job.output_file):
+                        print(f"Job {job_id} succeeded!")
                 elif any(x in state_str for x in ['FAILED', 'EXPIRED', 'CANCELLED']):
-                    print(f"Job {job_id} failed: {state_str}")
-                    info['status'] = 'FAILED'
-                    updated = True
-            except Exception as e:
-                logging.error(f"Error checking job {job_id}: {e}")
-
-        if updated:
-            with open(JOBS_FILE, 'w') as f:
-                json.dump(jobs, f, indent=2)
-
-    def get_job_results(self, job_id):
-        """Downloads and parses job results from OpenAI-style response."""
-        if not os.path.exists(JOBS_FILE):
+                    if self.jobs.transition(job_id, 'RUNNING', 'FAILED', completed_at=time.time()):
+                        print(f"Job {job_id} failed: {state_str}")
+            for future in pending:
+                job_id, info = futures[future]
+                logging.warning(f"Polling job {job_id} timed out after {POLL_TIMEOUT}s")
+                age = time.time() - info['created_at']
+                self.jobs.record_poll(job_id, 'TIMEOUT', None, time.time() + next_poll_delay(age))
+
+        purged = self.jobs.purge_finished()
+        if purged:
+            logging.info(f"Purged {purged} finished jobs past retention")
+
+    def seconds_until_next_poll(self):
+        """Seconds until the earliest scheduled poll of a RUNNING job, or None if there is none."""
+        running = self.jobs.find(status='RUNNING')
+        if not running:
             return None
-            
-        with open(JOBS_FILE, 'r') as f:
-            jobs = json.load(f)
-            
-        info = jobs.get(job_id)
+        next_at = min(info.get('next_poll_at', 0) for _, info in running)
+        return max(next_at - time.time(), 0.0)
+
+    def _results_path(self, job_id):
+        return os.path.join(RESULTS_DIR, job_id.replace('/', '_') + '.jsonl')
+
+    def download_job_results(self, job_id):
+        """
+        Streams a COMPLETED job's output file to RESULTS_DIR chunk by chunk
+        and returns the local path. The file is kept until the job is
+        processed, so an interrupted apply does not download it again.
+        """
+        info = self.jobs.get(job_id)
         if not info or info['status'] != 'COMPLETED' or not info.get('output_uri'):
             return None
 
+        path = self._results_path(job_id)
+        if os.path.exists(path):
+            return path
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        tmp_path = path + '.part'
         try:
             print(f"Downloading results for {job_id}...")
-            content = self.client.files.download(file=info['output_uri'])
-            
-            if isinstance(content, bytes):
-                full_content = content.decode('utf-8')
-            else:
-                full_content = b"".join(content).decode('utf-8')
-            
-            results = {}
-            for line in full_content.strip().split('\n'):
-                if not line: continue
-                resp = json.loads(line)
-                custom_id = resp.get('custom_id')
-                
-                # Extract text from OpenAI-compatible response format
-                try:
-                    choices = resp.get('response', {}).get('body', {}).get('choices', [])
-                    if choices:
-                        text = choices[0].get('message', {}).get('content', '')
-                        results[custom_id] = text
-                except Exception as parse_err:
-                    logging.error(f"Error parsing line for {custom_id}: {parse_err}")
-            
-            return results
+            content = self.backend.download_file(info['output_uri'])
+            with open(tmp_path, 'wb') as f:
+                if isinstance(content, bytes):
+                    f.write(content)
+                else:
+                    for chunk in content:
+                        f.write(chunk)
+            os.replace(tmp_path, path)
+            return path
         except Exception as e:
             logging.error(f"Error downloading results for {job_id}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
             return None
 
-    def process_completed_jobs(self, storage, extractor=None):
-        """Processes all COMPLETED jobs and updates storage/files."""
-        if not os.path.exists(JOBS_FILE):
+    @staticmethod
+    def _parse_result_line(line):
+        """Returns (custom_id, text) of one OpenAI-style output line, or None."""
+        resp = json.loads(line)
+        # Extract text from OpenAI-compatible response format
+        choices = resp.get('response', {}).get('body', {}).get('choices', [])
+        if not choices:
+            return None
+        return resp.get('custom_id'), choices[0].get('message', {}).get('content', '')
+
+    def _read_results(self, path, start=0):
+        """Yields (line_number, byte_offset, custom_id, text) for each result line after line `start`."""
+        with open(path, 'rb') as f:
+            line_no = 0
+            while True:
+                offset = f.tell()
+                line = f.readline()
+                if not line:
+                    break
+                line_no += 1
+                if line_no <= start or not line.strip():
+                    continue
+                try:
+                    parsed = self._parse_result_line(line)
+                except Exception as parse_err:
+                    logging.error(f"Error parsing result line {line_no} of {path}: {parse_err}")
+                    continue
+                if parsed:
+                    yield (line_no, offset) + parsed
+
+    def _read_result_at(self, path, offset):
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            return self._parse_result_line(f.readline())[1]
+
+    def iter_job_results(self, job_id, start=0):
+        """Lazily yields (line_number, custom_id, text) of a COMPLETED job, skipping the first `start` lines."""
+        path = self.download_job_results(job_id)
+        if not path:
             return
-            
-        with open(JOBS_FILE, 'r') as f:
+        for line_no, _, custom_id, text in self._read_results(path, start):
+            yield line_no, custom_id, text
+
+    def get_job_results(self, job_id):
+        """Downloads and parses job results from OpenAI-style response."""
+        if not self.download_job_results(job_id):
+            return None
+        return {custom_id: text for _, custom_id, text in self.iter_job_results(job_id)}
+
+    def _finish_job(self, job_id):
+        self.jobs.mark_processed(job_id)
+        path = self._results_path(job_id)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def process_completed_jobs(self, storage, extractor=None):
+        """
+        Processes all COMPLETED jobs and updates storage/files. Summary
+        results are applied RESULT_CHUNK_SIZE at a time through the day's
+        journal, and the job's result cursor is advanced after each chunk so
+        a crash resumes where it stopped. Each job is claimed first (see
+        JobStore.claim), so concurrent monitors never apply the same job.
+        """
+        done_groups = set()
+        for job_id, info in self.jobs.find(status='COMPLETED', processed=False):
+            # Claim the job so two monitors never apply the same results
+            if not self.jobs.claim(job_id):
+                continue
+            claims = [job_id]
             try:
-                jobs = json.load(f)
-            except:
-                return
-            
-        updated_any = False
-        for job_id, info in list(jobs.items()):
-            if info['status'] == 'COMPLETED' and not info.get('processed'):
-                results = self.get_job_results(job_id)
-                if not results:
+                info = self.jobs.get(job_id) # Fresh result cursor after the claim
+                path = self.download_job_results(job_id)
+                if not path:
                     continue
-                
+            
                 metadata = info.get('metadata', {})
                 if metadata.get('type') == 'summary':
                     date_str = metadata.get('date')
-                    print(f"Updating summary data for {date_str}...")
                     data = storage.load_daily_data(date_str)
                     if data:
-                        for p in data:
-                            if p['id'] in results:
-                                raw_result = results[p['id']]
+                        cursor = info.get('result_cursor', 0)
+                        if cursor:
+                            print(f"Resuming summary update for {date_str} from result {cursor}...")
+                        else:
+                            print(f"Updating summary data for {date_str}...")
+                        by_id = {p['id']: p for p in data}
+                        chunk = []
+                        for line_no, custom_id, raw_result in self.iter_job_results(job_id, start=cursor):
+                            p = by_id.get(custom_id)
+                            if p is not None:
                                 try:
                                     # Try to parse the result as JSON
                                     cleaned_text = raw_result.strip()
                                     if cleaned_text.startswith("```json"): cleaned_text = cleaned_text[7:]
                                     if cleaned_text.startswith("```"): cleaned_text = cleaned_text[3:]
                                     if cleaned_text.endswith("```"): cleaned_text = cleaned_text[:-3]
-                                    
+                                
                                     parsed_res = json.loads(cleaned_text.strip())
                                     p['summary_ja'] = parsed_res.get('summary_ja', 'パースエラー')
                                     p['contribution_ja'] = parsed_res.get('contribution_ja', 'パースエラー')
+                                    summary_cache.store(p)
                                 except Exception as e:
                                     logging.error(f"Failed to parse batch result JSON for {p['id']}: {e}")
                                     p['summary_ja'] = raw_result # Fallback to raw text
                                     p['contribution_ja'] = "エラー: JSON形式ではありません"
+                                chunk.append(p)
+                            cursor = line_no
+                            if len(chunk) >= RESULT_CHUNK_SIZE:
+                                storage.append_daily_updates(chunk, date_str)
+                                self.jobs.set_result_cursor(job_id, cursor)
+                                chunk = []
+                        storage.append_daily_updates(chunk, date_str)
+                        self.jobs.set_result_cursor(job_id, cursor)
+                        # Fold the journal back into the day file
                         storage.save_daily_data(data, date_str)
-                        info['processed'] = True
-                        updated_any = True
-                
+                        self._finish_job(job_id)
+            
                 elif metadata.get('type') == 'slide':
+                    # One PDF per logical job: wait until every shard has finished
+                    group_id = info.get('group_id', job_id)
+                    if group_id in done_groups:
+                        continue
+                    shards = self.jobs.find(group_id=group_id)
+                    if any(shard['status'] == 'RUNNING' for _, shard in shards):
+                        continue
+                    shard_ids = [shard_id for shard_id, shard in shards if shard['status'] == 'COMPLETED']
+                    for shard_id in shard_ids:
+                        if shard_id not in claims and self.jobs.claim(shard_id):
+                            claims.append(shard_id)
+                    if set(claims) != set(shard_ids):
+                        continue # Some shard is being applied (or was) by another process
+                    shard_paths = [self.download_job_results(shard_id) for shard_id in shard_ids]
+                    if not shard_ids or not all(shard_paths):
+                        continue
+
                     username = metadata.get('user')
                     date_str = metadata.get('date')
                     print(f"Generating Batch PDF for {username} on {date_str}...")
@@ -382,10 +586,15 @@ CRITICAL:
                     c.drawCentredString(w/2, h/2 - 20, f"Generated on {time.strftime('%Y-%m-%d')}")
                     c.showPage()
 
+                    # Byte offsets only; each result is read back when its slide is drawn
+                    offsets = {}
+                    for shard_path in shard_paths:
+                        for _, offset, custom_id, _ in self._read_results(shard_path):
+                            offsets[custom_id] = (shard_path, offset)
                     for paper in target_papers:
                         custom_id = paper['id']
-                        if custom_id in results:
-                            raw_result = results[custom_id]
+                        if custom_id in offsets:
+                            raw_result = self._read_result_at(*offsets[custom_id])
                             try:
                                 cleaned_text = raw_result.strip()
                                 if cleaned_text.startswith("```json"): cleaned_text = cleaned_text[7:]
@@ -395,8 +604,13 @@ CRITICAL:
                                 parsed_res = json.loads(cleaned_text.strip())
 
                                 url = paper.get('url')
-                                pdf_stream = extractor._download_pdf(url)
-                                images, _ = extractor._pdf_to_images(pdf_stream, num_pages=4)
+                                # Crop from the pages the model saw; render again only if they expired
+                                pages = slide_generator.page_cache.get(slide_generator.page_cache_key(custom_id))
+                                if pages:
+                                    images = slide_generator.decode_pages(pages)
+                                else:
+                                    pdf_stream = extractor._download_pdf(url)
+                                    images, _ = extractor._pdf_to_images(pdf_stream, num_pages=4)
 
                                 def crop_fig(fig_key):
                                     fig_info = parsed_res.get(fig_key)
@@ -439,9 +653,10 @@ CRITICAL:
                                 c.showPage()
 
                     c.save()
-                    info['processed'] = True
-                    updated_any = True
-
-        if updated_any:
-            with open(JOBS_FILE, 'w') as f:
-                json.dump(jobs, f, indent=2)
+                    for shard_id in shard_ids:
+                        self._finish_job(shard_id)
+                    done_groups.add(group_id)
+                    slide_generator.page_cache.evict()
+            finally:
+                for claimed_id in claims:
+                    self.jobs.release(claimed_id)
@@ -0,0 +1,187 @@
+"""
+Listing / abs page fixtures for the offline benchmarks.
+
+    python benchmarks/arxiv_fixtures.py record              # save the live cs.CV listing and its abs pages
+    python benchmarks/arxiv_fixtures.py synthetic --new 150 --cross 60 --replaced 90
+
+Fixtures are written to benchmarks/fixtures/:
+    list_<category>_new.html   listing pages
+    abs/<arxiv_id>.html        abstract pages
+"""
+import os
+import glob
+import random
+import argparse
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+ABS_DIR = os.path.join(FIXTURE_DIR, 'abs')
+
+WORDS = (
+    "vision transformer diffusion segmentation detection dataset benchmark "
+    "features attention contrastive learning depth estimation video point "
+    "cloud representation model training inference robust efficient scene "
+    "generation reconstruction tracking semantic multimodal language camera"
+).split()
+
+
+def listing_path(category='cs.CV'):
+    return os.path.join(FIXTURE_DIR, f"list_{category}_new.html")
+
+
+def listing_fixtures():
+    """Returns the paths of all saved listing pages."""
+    return sorted(glob.glob(os.path.join(FIXTURE_DIR, 'list_*_new.html')))
+
+
+def _sentence(rng, n):
+    return ' '.join(rng.choice(WORDS) for _ in range(n)).capitalize()
+
+
+def _entry(rng, index, arxiv_id, cross_from=None):
+    title = _sentence(rng, rng.randint(6, 14))
+    authors = ', '.join(
+        f'<a href="https://arxiv.org/a/author_{rng.randint(1, 9999)}">{_sentence(rng, 2)}</a>'
+        for _ in range(rng.randint(2, 9))
+    )
+    abstract = ' '.join(_sentence(rng, rng.randint(12, 30)) + '.' for _ in range(rng.randint(5, 10)))
+    cross = f" (cross-list from {cross_from})" if cross_from else ""
+    return f"""<dt>
+  <a name='item{index}'>[{index}]</a>
+  <a href ="/abs/{arxiv_id}" title="Abstract" id="{arxiv_id}">
+    arXiv:{arxiv_id}
+  </a>{cross}
+  [<a href="/pdf/{arxiv_id}" title="Download PDF" id="pdf-{arxiv_id}" aria-labelledby="pdf-{arxiv_id}">pdf</a>, <a href="https://arxiv.org/html/{arxiv_id}v1" title="View HTML" id="html-{arxiv_id}" aria-labelledby="html-{arxiv_id}" rel="noopener noreferrer" target="_blank">html</a>, <a href="/format/{arxiv_id}" title="Other formats" id="oth-{arxiv_id}" aria-labelledby="oth-{arxiv_id}">other</a>]
+</dt>
+<dd>
+  <div class='meta'>
+    <div class='list-title mathjax'><span class='descriptor'>Title:</span>
+      {title}
+    </div>
+    <div class='list-authors'>{authors}</div>
+    <div class='list-comments mathjax'><span class='descriptor'>Comments:</span>
+      {rng.randint(8, 30)} pages, {rng.randint(2, 12)} figures
+    </div>
+    <div class='list-subjects'><span class='descriptor'>Subjects:</span>
+      <span class="primary-subject">Computer Vision and Pattern Recognition (cs.CV)</span>; Machine Learning (cs.LG)
+    </div>
+    <p class='mathjax'>
+      {abstract}
+    </p>
+  </div>
+</dd>
+""", title, abstract
+
+
+def synthetic_listing(new=150, cross=60, replaced=90, seed=0, date_header="Tuesday, 13 January 2026"):
+    """
+    Builds a listing page in the arXiv /list/<cat>/new layout.
+    Returns (html, abs_pages) where abs_pages maps arxiv id -> abs page HTML.
+    """
+    rng = random.Random(seed)
+    nav = '\n'.join(f'<li><a href="/list/cs.{c}/recent">cs.{c}</a></li>' for c in range(200))
+    scripts = '\n'.join(f'<script>var config{i} = {{"k": "{"x" * 200}"}};</script>' for i in range(20))
+    parts = [f"""<!DOCTYPE html>
+<html lang="en">
+<head><title>Computer Vision and Pattern Recognition  new submissions</title>
+{scripts}
+</head>
+<body class="with-cu-identity">
+<header><ul class="nav">{nav}</ul></header>
+<div id="content"><div id='content-inner'><div id='dlpage'>
+<h1>Computer Vision and Pattern Recognition</h1>
+<h3>Showing new listings for {date_header}</h3>
+<div class='paging'>Total of {new + cross + replaced} entries</div>
+"""]
+    abs_pages = {}
+    index = 1
+    sections = [
+        ("New submissions", new, None),
+        ("Cross submissions", cross, "cs.LG"),
+        ("Replacement submissions", replaced, None),
+    ]
+    for heading, count, cross_from in sections:
+        parts.append(f"<dl id='articles'>\n<h3>{heading} (showing {count} of {count} entries)</h3>\n")
+        for _ in range(count):
+            arxiv_id = f"2601.{index:05d}"
+            entry, title, abstract = _entry(rng, index, arxiv_id, cross_from)
+            parts.append(entry)
+            abs_pages[arxiv_id] = synthetic_abs_page(arxiv_id, title, abstract)
+            index += 1
+        parts.append("</dl>\n")
+    parts.append("</div></div></div>\n<footer>" + nav + "</footer>\n</body>\n</html>\n")
+    return ''.join(parts), abs_pages
+
+
+def synthetic_abs_page(arxiv_id, title, abstract):
+    return f"""<!DOCTYPE html>
+<html lang="en"><head><title>[{arxiv_id}] {title}</title></head>
+<body><div id="abs">
+<h1 class="title mathjax"><span class="descriptor">Title:</span>{title}</h1>
+<blockquote class="abstract mathjax">
+  <span class="descriptor">Abstract:</span>{abstract}
+</blockquote>
+</div></body></html>
+"""
+
+
+def save_fixtures(listings, abs_pages):
+    """listings: {category: html}; abs_pages: {arxiv_id: html}."""
+    os.makedirs(ABS_DIR, exist_ok=True)
+    for category, html in listings.items():
+        with open(listing_path(category), 'w', encoding='utf-8') as f:
+            f.write(html)
+    for arxiv_id, html in abs_pages.items():
+        with open(os.path.join(ABS_DIR, f"{arxiv_id}.html"), 'w', encoding='utf-8') as f:
+            f.write(html)
+    print(f"Saved {len(listings)} listing(s) and {len(abs_pages)} abs page(s) to {FIXTURE_DIR}")
+
+
+def record(category='cs.CV', max_abs=None):
+    """Downloads the live listing and its abs pages."""
+    import re
+    import requests
+    session = requests.Session()
+    resp = session.get(f"https://arxiv.org/list/{category}/new", timeout=30)
+    resp.raise_for_status()
+    html = resp.text
+    ids = re.findall(r'href\s*=\s*"/abs/([^"]+)" title="Abstract"', html)
+    if max_abs:
+        ids = ids[:max_abs]
+    abs_pages = {}
+    for arxiv_id in ids:
+        r = session.get(f"https://arxiv.org/abs/{arxiv_id}", timeout=30)
+        if r.status_code == 200:
+            abs_pages[arxiv_id] = r.text
+    save_fixtures({category: html}, abs_pages)
+
+
+def ensure_fixtures():
+    """Returns the listing fixtures, synthesizing a default one if none are saved."""
+    paths = listing_fixtures()
+    if not paths:
+        print("No saved fixtures found; generating a synthetic cs.CV listing.")
+        html, abs_pages = synthetic_listing()
+        save_fixtures({'cs.CV': html}, abs_pages)
+        paths = listing_fixtures()
+    return paths
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='command', required=True)
+    rec = sub.add_parser('record', help='Save the live listing and abs pages')
+    rec.add_argument('--category', default='cs.CV')
+    rec.add_argument('--max-abs', type=int, default=None)
+    syn = sub.add_parser('synthetic', help='Generate a synthetic listing')
+    syn.add_argument('--category', default='cs.CV')
+    syn.add_argument('--new', type=int, default=150)
+    syn.add_argument('--cross', type=int, default=60)
+    syn.add_argument('--replaced', type=int, default=90)
+    syn.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    if args.command == 'record':
+        record(args.category, args.max_abs)
+    else:
+        html, abs_pages = synthetic_listing(args.new, args.cross, args.replaced, args.seed)
+        save_fixtures({args.category: html}, abs_pages)
@@ -0,0 +1,98 @@
+"""
+Compares the JSON and compact (day_format.py) day-file formats on a
+synthetic year of data: total size, time to load every day, and time to
+read one paper or one page of a day.
+
+    python benchmarks/bench_day_format.py [--days 365] [--papers 250] [--codec zlib]
+
+Day files go to a temporary directory.
+"""
+import os
+import sys
+import io
+import time
+import random
+import shutil
+import tempfile
+import argparse
+import contextlib
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import storage
+import day_format
+from bench_pipeline import make_papers
+
+
+def make_day(n, seed):
+    """Papers shaped like a summarized day (summary, contribution, translated title)."""
+    rng = random.Random(seed)
+    papers = make_papers(n, seed=seed)
+    for i, p in enumerate(papers):
+        p["id"] = f"arXiv:{seed:04d}.{i:05d}"
+        p["authors"] = ', '.join(f"Author {rng.randint(1, 9999)}" for _ in range(rng.randint(2, 8)))
+        p["title_ja"] = "「" + p["title"][:60] + "」の日本語訳"
+        p["summary_ja"] = "本論文では" + "提案手法は既存手法を上回る性能を示した。" * rng.randint(4, 10)
+        p["contribution_ja"] = "新しい手法を提案した。" * rng.randint(1, 3)
+    return papers
+
+
+def write_year(fmt, dates, days, codec):
+    storage.DAY_FILE_FORMAT = fmt
+    day_format.DAY_FILE_CODEC = codec
+    with contextlib.redirect_stdout(io.StringIO()):
+        for date_str, papers in zip(dates, days):
+            storage.save_daily_data(papers, date_str)
+    return sum(os.path.getsize(storage._day_path(d, fmt)) for d in dates)
+
+
+def timed(fn, repeat=1):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--papers', type=int, default=250)
+    parser.add_argument('--codec', choices=['zstd', 'zlib'], default=day_format.DAY_FILE_CODEC)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench_day_format_')
+    storage.DATA_DIR = workdir
+    storage.DAY_CACHE_MAX_BYTES = 0 # Measure file reads, not the day cache
+    first = date(2025, 1, 1)
+    dates = [(first + timedelta(days=i)).isoformat() for i in range(args.days)]
+    days = [make_day(args.papers, seed) for seed in range(args.days)]
+    rng = random.Random(0)
+    probes = [(d, f"arXiv:{i:04d}.{rng.randrange(args.papers):05d}") for i, d in enumerate(dates)]
+
+    try:
+        rows = []
+        for fmt in ('json', 'compact'):
+            size = write_year(fmt, dates, days, args.codec)
+            storage.DAY_FILE_FORMAT = fmt
+            full = timed(lambda: [storage.load_daily_data(d) for d in dates], args.repeat)
+            one = timed(lambda: [storage.load_paper(d, pid) for d, pid in probes], args.repeat)
+            page = timed(lambda: [storage.load_papers_page(d, 40, 20) for d in dates], args.repeat)
+            rows.append((fmt, size, full, one, page))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    codec = day_format._codec(args.codec)
+    print(f"{args.days} days x {args.papers} papers (compact codec: {codec})")
+    print(f"{'format':<8} {'size':>10} {'load all':>10} {'1 paper/day':>12} {'page/day':>10}")
+    for fmt, size, full, one, page in rows:
+        print(f"{fmt:<8} {size / 1e6:>8.1f}MB {full:>9.2f}s {one * 1e3 / args.days:>10.2f}ms {page * 1e3 / args.days:>8.2f}ms")
+    json_size, compact_size = rows[0][1], rows[1][1]
+    print(f"compact/json size: {compact_size / json_size:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Compares listing parse time and peak memory of the full html.parser tree
+(the original scraper) against scraper.parse_listing_document.
+
+    python benchmarks/bench_listing_parse.py [--repeat 20] [fixture.html ...]
+
+Without arguments every saved listing fixture is used (see arxiv_fixtures.py).
+"""
+import os
+import sys
+import io
+import time
+import argparse
+import tracemalloc
+import contextlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from bs4 import BeautifulSoup
+import scraper
+import arxiv_fixtures
+
+
+def baseline(content):
+    return BeautifulSoup(content, 'html.parser')
+
+
+def targeted(content):
+    return scraper.parse_listing_document(content)
+
+
+def measure(parse, content, repeat):
+    """Returns (best_seconds, peak_bytes, paper_count) for parse + extraction."""
+    best = float('inf')
+    papers = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            papers, _ = scraper.parse_listing(parse(content))
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        scraper.parse_listing(parse(content))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak, len(papers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('fixtures', nargs='*')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    paths = args.fixtures or arxiv_fixtures.ensure_fixtures()
+    print(f"Parser backend: {scraper.LISTING_PARSER} (strained to h3/dl)")
+    print(f"{'fixture':<32} {'engine':<10} {'papers':>6} {'best ms':>9} {'ms/paper':>9} {'peak MiB':>9}")
+    for path in paths:
+        with open(path, 'rb') as f:
+            content = f.read()
+        results = {}
+        for name, parse in (('baseline', baseline), ('targeted', targeted)):
+            best, peak, count = measure(parse, content, args.repeat)
+            results[name] = (best, peak)
+            per_paper = best * 1000 / count if count else 0.0
+            print(f"{os.path.basename(path):<32} {name:<10} {count:>6} {best * 1000:>9.1f} {per_paper:>9.3f} {peak / 2**20:>9.1f}")
+        (b_time, b_peak), (t_time, t_peak) = results['baseline'], results['targeted']
+        print(f"{'':<32} speedup x{b_time / t_time:.1f}, peak memory x{b_peak / max(t_peak, 1):.1f} lower")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Offline summarization throughput / retry benchmark on the fake LLM backend.
+
+    python benchmarks/bench_pipeline.py --papers 200 --latency 0.5 --rate-limit-rate 0.05 --malformed-rate 0.1
+    python benchmarks/bench_pipeline.py --papers 500 --mode batch --batch-seconds 2
+
+`sync` runs summarizer.summarize_and_translate (the ENABLE_SYNC_SUMMARIZATION
+path); `batch` submits a summary batch, polls it and applies the results.
+Data, caches and fake files go to a temporary directory.
+"""
+import os
+import sys
+import io
+import time
+import random
+import shutil
+import tempfile
+import argparse
+import contextlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import arxiv_fixtures
+
+
+def make_papers(n, seed=0):
+    rng = random.Random(seed)
+    papers = []
+    for i in range(n):
+        abstract = ' '.join(arxiv_fixtures._sentence(rng, rng.randint(12, 30)) + '.' for _ in range(rng.randint(3, 12)))
+        papers.append({
+            "id": f"arXiv:2601.{i:05d}",
+            "url": f"https://arxiv.org/abs/2601.{i:05d}",
+            "title": arxiv_fixtures._sentence(rng, rng.randint(6, 14)),
+            "abstract": abstract,
+        })
+    return papers
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mode', choices=['sync', 'batch'], default='sync')
+    parser.add_argument('--papers', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.2)
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0)
+    parser.add_argument('--retry-after', type=float, default=1.0)
+    parser.add_argument('--malformed-rate', type=float, default=0.0)
+    parser.add_argument('--batch-seconds', type=float, default=0.0)
+    parser.add_argument('--concurrency', type=int, default=None)
+    parser.add_argument('--rpm', type=float, default=None)
+    parser.add_argument('--tpm', type=float, default=None)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench_pipeline_')
+    os.environ.update({
+        "LLM_BACKEND": "fake",
+        "FAKE_LLM_LATENCY": str(args.latency),
+        "FAKE_LLM_RATE_LIMIT_RATE": str(args.rate_limit_rate),
+        "FAKE_LLM_RETRY_AFTER": str(args.retry_after),
+        "FAKE_LLM_MALFORMED_RATE": str(args.malformed_rate),
+        "FAKE_LLM_BATCH_SECONDS": str(args.batch_seconds),
+        "FAKE_LLM_DIR": os.path.join(workdir, 'fake_llm'),
+        "BATCH_POLL_MIN_INTERVAL": "0", # Poll on every check_jobs call
+        "BATCH_POLL_MAX_INTERVAL": "0",
+    })
+    if args.rpm:
+        os.environ["GEMINI_RPM"] = str(args.rpm)
+    if args.tpm:
+        os.environ["GEMINI_TPM"] = str(args.tpm)
+
+    import llm_backend
+    import storage
+    import summary_cache
+    import summarizer
+    import batch_processor
+    from job_store import JobStore
+
+    storage.DATA_DIR = os.path.join(workdir, 'data')
+    summary_cache.CACHE_DIR = os.path.join(workdir, 'summary_cache')
+    batch_processor.RESULTS_DIR = os.path.join(workdir, 'batch_results')
+
+    papers = make_papers(args.papers)
+    date_str = '2026-01-13'
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            if args.mode == 'sync':
+                summarizer.summarize_and_translate(papers, concurrency=args.concurrency)
+                result = papers
+            else:
+                storage.save_daily_data(papers, date_str)
+                jobs = JobStore(os.path.join(storage.DATA_DIR, 'batch_jobs.sqlite3'), legacy_file=None)
+                bp = batch_processor.BatchProcessor(job_store=jobs)
+                bp.submit_summary_batch(date_str, papers)
+                while True:
+                    bp.check_jobs()
+                    if not bp.is_job_running('summary', date_str):
+                        break
+                    time.sleep(0.2)
+                bp.process_completed_jobs(storage)
+                result = storage.load_daily_data(date_str)
+        wall = time.perf_counter() - start
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    errors = sum(1 for p in result if p.get('summary_ja') == "要約生成エラー")
+    counters = llm_backend.get_backend().counters
+    print(f"mode={args.mode} papers={len(result)} wall={wall:.2f}s throughput={len(result) / wall:.1f} papers/s")
+    print(f"backend: {counters}")
+    print(f"papers marked 要約生成エラー: {errors}")
+    if args.mode == 'sync':
+        print(f"summarizer: {summarizer.last_run_stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+End-to-end scraper benchmark against the local stand-in arXiv server.
+
+    python benchmarks/bench_scraper.py --latency 0.1 --error-rate 0.02
+    python benchmarks/bench_scraper.py --no-listing-abstracts --concurrency 8
+
+Runs scraper.fetch_papers over every category with a saved listing fixture
+and reports wall time, requests issued, bytes transferred and parse time per
+paper. No network access is needed.
+"""
+import os
+import re
+import sys
+import io
+import time
+import shutil
+import tempfile
+import argparse
+import contextlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import arxiv_fixtures
+from fake_arxiv import FakeArxivServer
+
+
+def fixture_categories():
+    names = [os.path.basename(p) for p in arxiv_fixtures.ensure_fixtures()]
+    return [re.fullmatch(r'list_(.+)_new\.html', n).group(1) for n in names]
+
+
+def run_once(scraper, categories, concurrency, delay):
+    """Returns (papers, wall_seconds, parse_seconds) for one cold fetch."""
+    parse_time = [0.0]
+    original_parse = scraper.parse_listing
+
+    def timed_parse(soup):
+        start = time.perf_counter()
+        try:
+            return original_parse(soup)
+        finally:
+            parse_time[0] += time.perf_counter() - start
+
+    scraper.parse_listing = timed_parse
+    scraper._listing_fetchers.clear() # Cold start: no validators, no parsed listings
+    try:
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            papers, _ = scraper.fetch_papers(categories=categories, concurrency=concurrency, delay=delay)
+        wall = time.perf_counter() - start
+    finally:
+        scraper.parse_listing = original_parse
+    return papers, wall, parse_time[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--latency', type=float, default=0.05, help='Artificial per-request latency (s)')
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with 503')
+    parser.add_argument('--no-listing-abstracts', action='store_true',
+                        help='Strip abstracts from served listings to exercise the abs-page path')
+    parser.add_argument('--concurrency', type=int, default=None)
+    parser.add_argument('--delay', type=float, default=0.0, help='Per-host politeness delay (s)')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--warm-cache', action='store_true', help='Keep the abstract cache between runs')
+    args = parser.parse_args()
+
+    categories = fixture_categories()
+    server = FakeArxivServer(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                             listing_abstracts=not args.no_listing_abstracts).start()
+    os.environ['ARXIV_BASE_URL'] = server.base_url
+    import scraper
+    from disk_cache import DiskCache
+
+    cache_dir = tempfile.mkdtemp(prefix='bench_abs_cache_')
+    print(f"Stand-in server: {server.base_url} | categories: {', '.join(categories)}")
+    print(f"latency={args.latency}s error_rate={args.error_rate} listing_abstracts={not args.no_listing_abstracts}")
+    print(f"{'run':>3} {'papers':>6} {'no abs':>6} {'wall s':>8} {'requests':>8} {'list/abs':>9} {'503s':>5} {'KiB':>8} {'parse ms/paper':>14}")
+    try:
+        for run in range(1, args.repeat + 1):
+            if not args.warm_cache:
+                shutil.rmtree(cache_dir, ignore_errors=True)
+            scraper.abstract_cache = DiskCache(cache_dir, ttl=scraper.ABSTRACT_CACHE_TTL)
+            server.reset_counters()
+
+            papers, wall, parse = run_once(scraper, categories, args.concurrency, args.delay)
+            c = server.counters()
+            missing = sum(1 for p in papers if not p.get('abstract'))
+            per_paper = parse * 1000 / len(papers) if papers else 0.0
+            kinds = f"{c['by_kind']['list']}/{c['by_kind']['abs']}"
+            print(f"{run:>3} {len(papers):>6} {missing:>6} {wall:>8.2f} {c['requests']:>8} {kinds:>9} {c['errors']:>5} {c['bytes_sent'] / 1024:>8.0f} {per_paper:>14.3f}")
+    finally:
+        server.stop()
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+A local stand-in for arxiv.org that serves recorded fixtures.
+
+    python benchmarks/fake_arxiv.py --port 8765 --latency 0.2 --error-rate 0.05
+
+Routes:
+    /list/<category>/new   fixtures/list_<category>_new.html (ETag / 304 supported)
+    /abs/<arxiv_id>        fixtures/abs/<arxiv_id>.html
+Every response is delayed by `latency` (+/- `jitter`) seconds, and a
+fraction `error_rate` of requests is answered with 503.
+"""
+import os
+import re
+import time
+import random
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import arxiv_fixtures
+
+LISTING_ABSTRACT_RE = re.compile(r"<p class='mathjax'>.*?</p>", re.S)
+
+
+class FakeArxivServer:
+    def __init__(self, fixture_dir=arxiv_fixtures.FIXTURE_DIR, latency=0.0, jitter=0.0,
+                 error_rate=0.0, listing_abstracts=True, seed=0, port=0):
+        self.fixture_dir = fixture_dir
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.listing_abstracts = listing_abstracts
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.reset_counters()
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def reset_counters(self):
+        with self.lock:
+            self.requests = 0
+            self.bytes_sent = 0
+            self.errors = 0
+            self.not_modified = 0
+            self.by_kind = {"list": 0, "abs": 0, "other": 0}
+
+    def counters(self):
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "bytes_sent": self.bytes_sent,
+                "errors": self.errors,
+                "not_modified": self.not_modified,
+                "by_kind": dict(self.by_kind),
+            }
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _load(self, path):
+        """Returns the fixture body for a request path, or None."""
+        match = re.fullmatch(r'/list/([^/]+)/new/?', path)
+        if match:
+            file_path = os.path.join(self.fixture_dir, f"list_{match.group(1)}_new.html")
+            kind = "list"
+        else:
+            match = re.fullmatch(r'/abs/(.+)', path)
+            if not match:
+                return "other", None
+            file_path = os.path.join(self.fixture_dir, 'abs', f"{match.group(1)}.html")
+            kind = "abs"
+        if not os.path.exists(file_path):
+            return kind, None
+        with open(file_path, 'r', encoding='utf-8') as f:
+            body = f.read()
+        if kind == "list" and not self.listing_abstracts:
+            # Forces the scraper onto its abs-page fallback path
+            body = LISTING_ABSTRACT_RE.sub('', body)
+        return kind, body.encode('utf-8')
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body=b'', headers=None):
+                self.send_response(status)
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                if body:
+                    self.wfile.write(body)
+                with server.lock:
+                    server.bytes_sent += len(body)
+
+            def do_GET(self):
+                with server.lock:
+                    server.requests += 1
+                    delay = max(0.0, server.latency + server.rng.uniform(-server.jitter, server.jitter))
+                    fail = server.rng.random() < server.error_rate
+                if delay:
+                    time.sleep(delay)
+
+                kind, body = server._load(self.path)
+                with server.lock:
+                    server.by_kind[kind] += 1
+                if fail:
+                    with server.lock:
+                        server.errors += 1
+                    return self._send(503, b'Service Unavailable (injected)')
+                if body is None:
+                    return self._send(404, b'Not Found')
+
+                etag = '"%s"' % hashlib.md5(body).hexdigest()
+                if self.headers.get('If-None-Match') == etag:
+                    with server.lock:
+                        server.not_modified += 1
+                    return self._send(304, headers={'ETag': etag})
+                self._send(200, body, {'Content-Type': 'text/html; charset=utf-8', 'ETag': etag})
+
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--no-listing-abstracts', action='store_true')
+    args = parser.parse_args()
+
+    arxiv_fixtures.ensure_fixtures()
+    server = FakeArxivServer(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                             listing_abstracts=not args.no_listing_abstracts, port=args.port)
+    print(f"Serving fixtures at {server.base_url} (set ARXIV_BASE_URL to use it)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
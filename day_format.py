@@ -0,0 +1,196 @@
+"""
+Compact on-disk format for day files: data/YYYY-MM-DD.dayz.
+
+Each paper is serialized as JSON and compressed on its own, followed by an
+index of (id, offset, length) for every record. Reading one paper, or one
+page of papers, seeks straight to its bytes and decompresses only those
+records. Records are compressed with zstandard when it is installed and
+zlib otherwise; the codec is stored in the file, so either can be read
+back (zstd files need the zstandard package).
+
+Layout:
+    MAGIC | record 0 | record 1 | ... | index (JSON) | footer
+
+    footer = <index offset: u64> <index length: u64> MAGIC
+
+    python day_format.py convert --to compact    # rewrite data/*.json as .dayz
+    python day_format.py convert --to json       # and back
+    python day_format.py stats
+"""
+import os
+import re
+import json
+import zlib
+import struct
+import argparse
+
+try:
+    import zstandard
+except ImportError: # zlib only
+    zstandard = None
+
+MAGIC = b'ADAYZ1\n'
+FOOTER = struct.Struct('<QQ')
+EXTENSION = '.dayz'
+
+# 'zstd' or 'zlib'; zstd falls back to zlib when zstandard is not installed
+DAY_FILE_CODEC = os.environ.get("DAY_FILE_CODEC", "zstd")
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 9
+
+def _codec(name=DAY_FILE_CODEC):
+    if name == 'zstd' and zstandard is None:
+        return 'zlib'
+    return name
+
+def _compressor(codec):
+    if codec == 'zstd':
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress
+    if codec == 'zlib':
+        return lambda raw: zlib.compress(raw, ZLIB_LEVEL)
+    raise ValueError(f"Unknown day file codec: {codec}")
+
+def _decompressor(codec):
+    if codec == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("This day file is zstd-compressed; install the zstandard package to read it.")
+        return zstandard.ZstdDecompressor().decompress
+    if codec == 'zlib':
+        return zlib.decompress
+    raise ValueError(f"Unknown day file codec: {codec}")
+
+def write_day(path, papers, codec=None):
+    """Writes `papers` to `path` in the compact format, replacing it atomically."""
+    codec = _codec(codec or DAY_FILE_CODEC)
+    compress = _compressor(codec)
+    records = []
+    raw_bytes = 0
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        for paper in papers:
+            raw = json.dumps(paper, ensure_ascii=False).encode('utf-8')
+            blob = compress(raw)
+            records.append([paper.get('id'), f.tell(), len(blob)])
+            raw_bytes += len(raw)
+            f.write(blob)
+        index = json.dumps({"version": 1, "codec": codec, "raw_bytes": raw_bytes, "records": records},
+                           ensure_ascii=False).encode('utf-8')
+        index_offset = f.tell()
+        f.write(index)
+        f.write(FOOTER.pack(index_offset, len(index)) + MAGIC)
+    os.replace(tmp_path, path)
+
+class DayFile:
+    """
+    Read access to one compact day file. Only the footer and index are read
+    on open; paper records are read and decompressed on demand.
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a compact day file")
+            f.seek(-(FOOTER.size + len(MAGIC)), os.SEEK_END)
+            tail = f.read()
+            if tail[FOOTER.size:] != MAGIC:
+                raise ValueError(f"{path} is truncated (no index footer)")
+            index_offset, index_length = FOOTER.unpack(tail[:FOOTER.size])
+            f.seek(index_offset)
+            index = json.loads(f.read(index_length))
+        self.codec = index['codec']
+        self.raw_bytes = index.get('raw_bytes', 0)
+        self.records = index['records']
+        self._positions = {record[0]: i for i, record in enumerate(self.records)}
+        self._decompress = _decompressor(self.codec)
+
+    def __len__(self):
+        return len(self.records)
+
+    @property
+    def ids(self):
+        return [record[0] for record in self.records]
+
+    def _read(self, start, stop):
+        records = self.records[start:stop]
+        if not records:
+            return []
+        first, last = records[0], records[-1]
+        with open(self.path, 'rb') as f:
+            f.seek(first[1])
+            # Records are contiguous, so a page is one read
+            buf = f.read(last[1] + last[2] - first[1])
+        base = first[1]
+        return [json.loads(self._decompress(buf[offset - base:offset - base + length]))
+                for _, offset, length in records]
+
+    def page(self, offset, limit):
+        """Papers [offset, offset + limit) in listing order."""
+        offset = max(offset, 0)
+        return self._read(offset, offset + max(limit, 0))
+
+    def get(self, paper_id):
+        """One paper by id, or None."""
+        pos = self._positions.get(paper_id)
+        return self._read(pos, pos + 1)[0] if pos is not None else None
+
+    def position(self, paper_id):
+        return self._positions.get(paper_id)
+
+    def read_all(self):
+        return self._read(0, len(self.records))
+
+def read_day(path):
+    return DayFile(path).read_all()
+
+def convert(data_dir, to='compact', codec=None):
+    """
+    Rewrites every day file under `data_dir` in the other format and removes
+    the original. Update journals are left alone; they apply to either.
+    Returns [(date, bytes before, bytes after)].
+    """
+    source_ext, target_ext = ('.json', EXTENSION) if to == 'compact' else (EXTENSION, '.json')
+    date_pattern = re.compile(r'^(\d{4}-\d{2}-\d{2})' + re.escape(source_ext) + '$')
+    converted = []
+    for name in sorted(os.listdir(data_dir)) if os.path.exists(data_dir) else []:
+        match = date_pattern.match(name)
+        if not match:
+            continue
+        source = os.path.join(data_dir, name)
+        target = os.path.join(data_dir, match.group(1) + target_ext)
+        if to == 'compact':
+            with open(source, 'r', encoding='utf-8') as f:
+                write_day(target, json.load(f), codec)
+        else:
+            tmp_path = f"{target}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(read_day(source), f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, target)
+        converted.append((match.group(1), os.path.getsize(source), os.path.getsize(target)))
+        os.remove(source)
+    return converted
+
+if __name__ == "__main__":
+    import storage
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='command', required=True)
+    conv = sub.add_parser('convert', help='Rewrite all day files in one format')
+    conv.add_argument('--to', choices=['compact', 'json'], default='compact')
+    conv.add_argument('--codec', choices=['zstd', 'zlib'], default=None)
+    sub.add_parser('stats', help='Show day file counts and sizes per format')
+    args = parser.parse_args()
+
+    if args.command == 'convert':
+        converted = convert(storage.DATA_DIR, args.to, args.codec)
+        before = sum(c[1] for c in converted)
+        after = sum(c[2] for c in converted)
+        print(f"Converted {len(converted)} day files to {args.to}: {before / 1e6:.1f} MB -> {after / 1e6:.1f} MB")
+        if args.to == 'compact' and storage.DAY_FILE_FORMAT != 'compact':
+            print("Set DAY_FILE_FORMAT=compact so new days are written in this format too.")
+    else:
+        for ext in ('.json', EXTENSION):
+            paths = [os.path.join(storage.DATA_DIR, n) for n in os.listdir(storage.DATA_DIR)
+                     if re.match(r'^\d{4}-\d{2}-\d{2}' + re.escape(ext) + '$', n)] \
+                if os.path.exists(storage.DATA_DIR) else []
+            print(f"{ext:<6} {len(paths):>5} files  {sum(os.path.getsize(p) for p in paths) / 1e6:.1f} MB")
@@ -0,0 +1,137 @@
+import os
+import json
+import time
+import hashlib
+import threading
+
+class DiskCache:
+    """
+    A persistent key/value cache with one JSON file per entry.
+    Entries older than `ttl` seconds (since written, however often they are
+    read) are treated as misses and removed. When the directory grows beyond
+    `max_bytes`, the least recently used entries are evicted. A file's mtime
+    is its write time and its atime, set on every hit, its last use.
+    """
+    def __init__(self, directory, ttl=None, max_bytes=None):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.total_bytes = None # Computed lazily on the first write
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+    def _path(self, key):
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, digest[:2], f"{digest}.json")
+
+    def get(self, key, default=None):
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+                written_ns = os.fstat(f.fileno()).st_mtime_ns
+        except (OSError, ValueError):
+            self._count('misses')
+            return default
+
+        if self.ttl is not None and time.time() - entry.get('stored_at', 0) > self.ttl:
+            self._remove(path)
+            self._count('misses')
+            return default
+
+        try:
+            os.utime(path, ns=(time.time_ns(), written_ns)) # Mark as recently used, keep the write time
+        except OSError:
+            pass
+        self._count('hits')
+        return entry.get('value')
+
+    def put(self, key, value):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        payload = json.dumps({"key": key, "stored_at": time.time(), "value": value}, ensure_ascii=False)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(payload)
+        old_size = os.path.getsize(path) if os.path.exists(path) else 0
+        os.replace(tmp_path, path)
+
+        with self.lock:
+            self.writes += 1
+            if self.total_bytes is not None:
+                self.total_bytes += len(payload.encode('utf-8')) - old_size
+        if self.max_bytes is not None:
+            if self.total_bytes is None:
+                self.total_bytes = self._scan_size()
+            if self.total_bytes > self.max_bytes:
+                self.evict()
+
+    def delete(self, key):
+        return self._remove(self._path(key))
+
+    def clear(self):
+        for path, _, _, _ in self._entries():
+            self._remove(path)
+
+    def evict(self):
+        """Drops expired entries, then the oldest ones until under 90% of max_bytes."""
+        entries = sorted(self._entries(), key=lambda e: e[1]) # Least recently used first
+        now = time.time()
+        total = sum(size for _, _, _, size in entries)
+        target = self.max_bytes * 0.9 if self.max_bytes is not None else None
+        removed = 0
+        for path, _, written, size in entries:
+            expired = self.ttl is not None and now - written > self.ttl
+            over_budget = target is not None and total > target
+            if not expired and not over_budget:
+                continue
+            if self._remove(path):
+                total -= size
+                removed += 1
+        with self.lock:
+            self.total_bytes = total
+            self.evictions += removed
+        return removed
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "writes": self.writes,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def _count(self, name):
+        with self.lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+    def _entries(self):
+        """Yields (path, last used, written, size) for every stored entry."""
+        if not os.path.exists(self.directory):
+            return
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith('.json'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                yield path, max(st.st_atime, st.st_mtime), st.st_mtime, st.st_size
+
+    def _scan_size(self):
+        return sum(size for _, _, _, size in self._entries())
@@ -0,0 +1,289 @@
+"""
+Transactional registry of Batch API jobs backed by SQLite.
+
+Replaces data/batch_jobs.json: lookups go through indexes on
+(type, date, user, status), status changes are single conditional UPDATEs,
+and finished jobs are purged after a retention period. An existing
+batch_jobs.json is imported once and renamed to batch_jobs.json.migrated.
+
+    python job_store.py list [--status RUNNING]
+    python job_store.py purge --days 90
+"""
+import os
+import json
+import time
+import sqlite3
+import argparse
+import threading
+import contextlib
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+DB_PATH = os.path.join(DATA_DIR, 'batch_jobs.sqlite3')
+LEGACY_JOBS_FILE = os.path.join(DATA_DIR, 'batch_jobs.json')
+
+# Finished jobs (processed COMPLETED or FAILED) older than this are purged
+JOB_RETENTION_DAYS = float(os.environ.get("JOB_RETENTION_DAYS", "90"))
+
+# A process applying a COMPLETED job claims it for this long; a claim left
+# behind by a crash expires, and the job resumes from its result cursor
+JOB_CLAIM_LEASE = float(os.environ.get("JOB_CLAIM_LEASE", "3600"))
+
+FINISHED_STATUSES = ('COMPLETED', 'FAILED')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id       TEXT PRIMARY KEY,
+    type         TEXT,
+    date         TEXT,
+    user         TEXT,
+    status       TEXT NOT NULL,
+    created_at   REAL NOT NULL,
+    completed_at REAL,
+    output_uri   TEXT,
+    processed    INTEGER NOT NULL DEFAULT 0,
+    metadata     TEXT NOT NULL DEFAULT '{}'
+);
+"""
+
+INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_jobs_lookup ON jobs (type, date, user, status);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, processed, created_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_poll ON jobs (status, next_poll_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_group ON jobs (group_id);
+"""
+
+# Columns added after the first release; created on open if missing
+ADDED_COLUMNS = {
+    "next_poll_at": "REAL",
+    "poll_count": "INTEGER NOT NULL DEFAULT 0",
+    "last_poll_at": "REAL",
+    "last_poll_latency": "REAL",
+    "last_state": "TEXT",
+    "result_cursor": "INTEGER NOT NULL DEFAULT 0", # Result lines already applied
+    "group_id": "TEXT", # Shards of one logical submission share a group id
+    "claimed_until": "REAL", # Lease of the process applying the results
+}
+
+# Database paths whose schema is up to date in this process
+_initialized = set()
+_init_lock = threading.Lock()
+
+class JobStore:
+    def __init__(self, db_path=DB_PATH, legacy_file=LEGACY_JOBS_FILE):
+        self.db_path = db_path
+        # Stores are created per request (web app) and per BatchProcessor, so
+        # the schema and migrations run only on the first open of each path
+        with _init_lock:
+            if db_path not in _initialized:
+                os.makedirs(os.path.dirname(db_path), exist_ok=True)
+                self._migrate_schema()
+                _initialized.add(db_path)
+        if legacy_file and os.path.exists(legacy_file):
+            self._migrate_legacy(legacy_file)
+
+    def _migrate_schema(self):
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            existing = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, decl in ADDED_COLUMNS.items():
+                if column in existing:
+                    continue
+                try:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {decl}")
+                except sqlite3.OperationalError as e:
+                    # Tolerate another process adding it since PRAGMA table_info ran
+                    if 'duplicate column' not in str(e):
+                        raise
+            # Jobs recorded before sharding are groups of one
+            conn.execute("UPDATE jobs SET group_id = job_id WHERE group_id IS NULL")
+            conn.executescript(INDEXES)
+
+    @contextlib.contextmanager
+    def _connect(self):
+        """One short-lived connection per operation; commits on success."""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _to_info(row):
+        """Returns the job in the dict shape batch_jobs.json used."""
+        info = {
+            "status": row["status"],
+            "created_at": row["created_at"],
+            "metadata": json.loads(row["metadata"] or '{}'),
+        }
+        if row["completed_at"] is not None:
+            info["completed_at"] = row["completed_at"]
+        if row["output_uri"]:
+            info["output_uri"] = row["output_uri"]
+        if row["processed"]:
+            info["processed"] = True
+        if row["poll_count"]:
+            info["poll_count"] = row["poll_count"]
+            info["last_poll_at"] = row["last_poll_at"]
+            info["last_poll_latency"] = row["last_poll_latency"]
+            info["last_state"] = row["last_state"]
+        if row["next_poll_at"] is not None:
+            info["next_poll_at"] = row["next_poll_at"]
+        if row["group_id"]:
+            info["group_id"] = row["group_id"]
+        if row["result_cursor"]:
+            info["result_cursor"] = row["result_cursor"]
+        return info
+
+    def _migrate_legacy(self, legacy_file):
+        try:
+            with open(legacy_file, 'r') as f:
+                jobs = json.load(f)
+        except FileNotFoundError:
+            return # Another process migrated it first
+        except (OSError, ValueError):
+            jobs = {}
+        with self._connect() as conn:
+            for job_id, info in jobs.items():
+                metadata = info.get('metadata', {})
+                conn.execute(
+                    "INSERT OR IGNORE INTO jobs (job_id, type, date, user, status, created_at, completed_at,"
+                    " output_uri, processed, metadata, group_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (job_id, metadata.get('type'), metadata.get('date'), metadata.get('user'),
+                     info.get('status', 'RUNNING'), info.get('created_at', time.time()), info.get('completed_at'),
+                     info.get('output_uri'), 1 if info.get('processed') else 0, json.dumps(metadata), job_id))
+        try:
+            os.replace(legacy_file, legacy_file + '.migrated')
+        except FileNotFoundError:
+            return # Migrated concurrently; the inserts above were no-ops
+        print(f"Migrated {len(jobs)} jobs from {legacy_file} to {self.db_path}")
+
+    def add(self, job_id, metadata, status='RUNNING', group_id=None, next_poll_at=None):
+        """Registers a job; `next_poll_at` (epoch seconds) schedules its first status poll."""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO jobs (job_id, type, date, user, status, created_at, metadata, group_id,"
+                " next_poll_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, metadata.get('type'), metadata.get('date'), metadata.get('user'),
+                 status, time.time(), json.dumps(metadata), group_id or job_id, next_poll_at))
+
+    def get(self, job_id):
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return self._to_info(row) if row else None
+
+    def find(self, job_type=None, date=None, user=None, status=None, processed=None, group_id=None):
+        """Returns [(job_id, info)] matching every given filter, oldest first."""
+        clauses, params = [], []
+        for column, value in (('type', job_type), ('date', date), ('user', user), ('status', status),
+                              ('group_id', group_id)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if processed is not None:
+            clauses.append("processed = ?")
+            params.append(1 if processed else 0)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._connect() as conn:
+            rows = conn.execute(f"SELECT * FROM jobs {where} ORDER BY created_at", params).fetchall()
+        return [(row["job_id"], self._to_info(row)) for row in rows]
+
+    def is_running(self, job_type, date, user=None):
+        sql = "SELECT 1 FROM jobs WHERE type = ? AND date = ? AND status = 'RUNNING'"
+        params = [job_type, date]
+        if user:
+            sql += " AND user = ?"
+            params.append(user)
+        with self._connect() as conn:
+            return conn.execute(sql + " LIMIT 1", params).fetchone() is not None
+
+    def due_for_poll(self, now=None):
+        """Returns [(job_id, info)] of RUNNING jobs whose next poll time has come."""
+        now = time.time() if now is None else now
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM jobs WHERE status = 'RUNNING' AND (next_poll_at IS NULL OR next_poll_at <= ?)"
+                " ORDER BY next_poll_at", (now,)).fetchall()
+        return [(row["job_id"], self._to_info(row)) for row in rows]
+
+    def record_poll(self, job_id, state, latency, next_poll_at):
+        """Records one status poll and when the job should be polled next."""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET poll_count = poll_count + 1, last_poll_at = ?, last_poll_latency = ?,"
+                " last_state = ?, next_poll_at = ? WHERE job_id = ?",
+                (time.time(), latency, state, next_poll_at, job_id))
+
+    def set_result_cursor(self, job_id, cursor):
+        with self._connect() as conn:
+            conn.execute("UPDATE jobs SET result_cursor = ? WHERE job_id = ?", (cursor, job_id))
+
+    def transition(self, job_id, from_status, to_status, **fields):
+        """
+        Atomically moves a job from `from_status` to `to_status`, setting the
+        given columns (completed_at, output_uri). Returns False if the job
+        was not in `from_status` (e.g. another process got there first).
+        """
+        assignments = ["status = ?"] + [f"{column} = ?" for column in fields]
+        params = [to_status, *fields.values(), job_id, from_status]
+        with self._connect() as conn:
+            cur = conn.execute(f"UPDATE jobs SET {', '.join(assignments)} WHERE job_id = ? AND status = ?", params)
+            return cur.rowcount == 1
+
+    def claim(self, job_id, lease=JOB_CLAIM_LEASE):
+        """
+        Claims an unprocessed COMPLETED job for applying its results. Returns
+        False if another process holds an unexpired claim (or it is processed).
+        """
+        now = time.time()
+        with self._connect() as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET claimed_until = ? WHERE job_id = ? AND status = 'COMPLETED' AND processed = 0"
+                " AND (claimed_until IS NULL OR claimed_until < ?)", (now + lease, job_id, now))
+            return cur.rowcount == 1
+
+    def release(self, job_id):
+        with self._connect() as conn:
+            conn.execute("UPDATE jobs SET claimed_until = NULL WHERE job_id = ?", (job_id,))
+
+    def mark_processed(self, job_id):
+        """Marks a COMPLETED job as applied. Returns False if it already was."""
+        with self._connect() as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET processed = 1 WHERE job_id = ? AND status = 'COMPLETED' AND processed = 0",
+                (job_id,))
+            return cur.rowcount == 1
+
+    def purge_finished(self, older_than_days=JOB_RETENTION_DAYS):
+        """Deletes processed COMPLETED and FAILED jobs older than the retention period."""
+        cutoff = time.time() - older_than_days * 86400
+        with self._connect() as conn:
+            cur = conn.execute(
+                "DELETE FROM jobs WHERE created_at < ? AND"
+                " ((status = 'COMPLETED' AND processed = 1) OR status = 'FAILED')",
+                (cutoff,))
+            return cur.rowcount
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='command', required=True)
+    lst = sub.add_parser('list', help='List jobs')
+    lst.add_argument('--status')
+    lst.add_argument('--type')
+    prg = sub.add_parser('purge', help='Delete finished jobs past the retention period')
+    prg.add_argument('--days', type=float, default=JOB_RETENTION_DAYS)
+    args = parser.parse_args()
+
+    store = JobStore()
+    if args.command == 'list':
+        for job_id, info in store.find(job_type=args.type, status=args.status):
+            created = time.strftime('%Y-%m-%d %H:%M', time.localtime(info['created_at']))
+            polls = f"polls={info.get('poll_count', 0)}"
+            if info.get('last_poll_latency') is not None:
+                polls += f" last={info['last_state']} ({info['last_poll_latency']:.2f}s)"
+            print(f"{job_id}  {info['status']:<9} {created}  {polls}  {json.dumps(info['metadata'], ensure_ascii=False)}")
+    else:
+        print(f"Purged {store.purge_finished(args.days)} finished jobs.")
@@ -0,0 +1,315 @@
+"""
+The single LLM interface used by summarizer, batch_processor and
+slide_generator.
+
+LLM_BACKEND selects the implementation:
+    gemini (default)  Google Gemini through google-generativeai / google-genai
+    fake              In-process deterministic stand-in for offline load tests
+
+The fake backend is tuned with environment variables:
+    FAKE_LLM_LATENCY           seconds per generate_content call (default 0)
+    FAKE_LLM_RATE_LIMIT_RATE   fraction of calls failing with a 429 (default 0)
+    FAKE_LLM_RETRY_AFTER       retry hint in those errors, seconds (default 1)
+    FAKE_LLM_MALFORMED_RATE    fraction of responses dropped/truncated (default 0)
+    FAKE_LLM_BATCH_SECONDS     time until a batch job succeeds (default 0)
+    FAKE_LLM_DIR               where uploaded files and batch jobs are kept
+    FAKE_LLM_SEED              random seed (default 0)
+"""
+import os
+import re
+import json
+import time
+import uuid
+import random
+import threading
+from abc import ABC, abstractmethod
+
+DEFAULT_MODEL = 'gemini-3-flash-preview'
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+class LLMResponse:
+    def __init__(self, text, finish_reason=None):
+        self.text = text
+        self.finish_reason = finish_reason # Name such as 'STOP' or 'MAX_TOKENS'
+
+class BatchJob:
+    def __init__(self, name, state, output_file=None):
+        self.name = name
+        self.state = state # e.g. 'JOB_STATE_RUNNING', 'JOB_STATE_SUCCEEDED'
+        self.output_file = output_file
+
+class BoundModel:
+    """A backend bound to one model name, exposing generate_content(contents)."""
+    def __init__(self, backend, model_name):
+        self.backend = backend
+        self.model_name = model_name
+
+    def generate_content(self, contents):
+        return self.backend.generate_content(self.model_name, contents)
+
+class LLMBackend(ABC):
+    """Interface implemented by every backend; a backend missing a method fails when created."""
+    def model(self, model_name=DEFAULT_MODEL):
+        return BoundModel(self, model_name)
+
+    @abstractmethod
+    def generate_content(self, model_name, contents):
+        """contents: a prompt string or a list of strings and PIL images. Returns LLMResponse."""
+
+    @abstractmethod
+    def upload_file(self, path, mime_type):
+        """Uploads a local file and returns its remote name."""
+
+    @abstractmethod
+    def create_batch(self, model_name, src):
+        """Starts a batch job over an uploaded JSONL file. Returns BatchJob."""
+
+    @abstractmethod
+    def get_batch(self, name):
+        """Returns the current BatchJob state."""
+
+    @abstractmethod
+    def download_file(self, name):
+        """Returns the file content as bytes or an iterable of byte chunks."""
+
+class GeminiBackend(LLMBackend):
+    def __init__(self, api_key=None):
+        self.api_key = api_key or os.environ.get("GEMINI_API_KEY")
+        if not self.api_key:
+            raise ValueError("GEMINI_API_KEY is required.")
+        self._models = {}
+        self._client = None
+        self._lock = threading.Lock()
+
+    def _model(self, model_name):
+        with self._lock:
+            if model_name not in self._models:
+                import google.generativeai as genai
+                genai.configure(api_key=self.api_key)
+                self._models[model_name] = genai.GenerativeModel(model_name)
+            return self._models[model_name]
+
+    @property
+    def client(self):
+        with self._lock:
+            if self._client is None:
+                from google import genai
+                self._client = genai.Client(api_key=self.api_key, http_options={'api_version': 'v1beta'})
+            return self._client
+
+    def generate_content(self, model_name, contents):
+        response = self._model(model_name).generate_content(contents)
+        try:
+            # An IntEnum in the SDK; str() of it is just the number on Python 3.11+
+            reason = response.candidates[0].finish_reason
+            finish_reason = getattr(reason, 'name', None) or str(reason)
+        except (AttributeError, IndexError, TypeError):
+            finish_reason = None
+        return LLMResponse(response.text, finish_reason)
+
+    def upload_file(self, path, mime_type):
+        # argument name is 'file' and we specify mime_type
+        gfile = self.client.files.upload(file=path, config={'mime_type': mime_type})
+        return gfile.name
+
+    def create_batch(self, model_name, src):
+        job = self.client.batches.create(model=f'models/{model_name}', src=src)
+        return BatchJob(job.name, str(job.state))
+
+    def get_batch(self, name):
+        job = self.client.batches.get(name=name)
+        dest = getattr(job, 'dest', None)
+        return BatchJob(job.name, str(job.state), getattr(dest, 'file_name', None))
+
+    def download_file(self, name):
+        # Stream the media download instead of letting the SDK buffer the whole file
+        import requests
+        url = f"https://generativelanguage.googleapis.com/download/v1beta/{name}:download"
+        try:
+            resp = requests.get(url, params={'alt': 'media'}, headers={'x-goog-api-key': self.api_key},
+                                stream=True, timeout=60)
+        except requests.RequestException:
+            return self.client.files.download(file=name)
+        if resp.status_code != 200:
+            resp.close()
+            return self.client.files.download(file=name)
+        return resp.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE)
+
+class FakeRateLimitError(Exception):
+    pass
+
+class FakeBackend(LLMBackend):
+    """
+    Deterministic stand-in that answers every prompt type used by this repo:
+    multi-paper summary arrays, single-paper batch summaries and slide JSON.
+    Uploaded files and batch jobs live under `directory`, so the monitor and
+    the web app can share fake jobs across processes.
+    """
+    def __init__(self, latency=0.0, rate_limit_rate=0.0, retry_after=1.0, malformed_rate=0.0,
+                 batch_seconds=0.0, directory=None, seed=0):
+        self.latency = latency
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.malformed_rate = malformed_rate
+        self.batch_seconds = batch_seconds
+        self.directory = directory or os.path.join(os.path.dirname(__file__), 'data', 'fake_llm')
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counters = {"calls": 0, "rate_limited": 0, "malformed": 0, "uploads": 0, "batches": 0}
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            latency=float(os.environ.get("FAKE_LLM_LATENCY", "0")),
+            rate_limit_rate=float(os.environ.get("FAKE_LLM_RATE_LIMIT_RATE", "0")),
+            retry_after=float(os.environ.get("FAKE_LLM_RETRY_AFTER", "1")),
+            malformed_rate=float(os.environ.get("FAKE_LLM_MALFORMED_RATE", "0")),
+            batch_seconds=float(os.environ.get("FAKE_LLM_BATCH_SECONDS", "0")),
+            directory=os.environ.get("FAKE_LLM_DIR"),
+            seed=int(os.environ.get("FAKE_LLM_SEED", "0")),
+        )
+
+    def _count(self, key):
+        with self.lock:
+            self.counters[key] += 1
+
+    def _roll(self, rate):
+        with self.lock:
+            return self.rng.random() < rate
+
+    # --- generate_content ---
+
+    def generate_content(self, model_name, contents):
+        self._count("calls")
+        if self.latency:
+            time.sleep(self.latency)
+        if self._roll(self.rate_limit_rate):
+            self._count("rate_limited")
+            raise FakeRateLimitError(f"429 RESOURCE_EXHAUSTED: Quota exceeded. Please retry in {self.retry_after}s.")
+
+        prompt = contents if isinstance(contents, str) else next((c for c in contents if isinstance(c, str)), '')
+        text = self.respond(prompt)
+        if self._roll(self.malformed_rate):
+            self._count("malformed")
+            return LLMResponse(self._corrupt(text), 'MAX_TOKENS')
+        return LLMResponse(text, 'STOP')
+
+    def respond(self, prompt):
+        """Builds a well-formed answer for one of the repo's prompts."""
+        if '"title_en"' in prompt:
+            return json.dumps(self._slide(prompt), ensure_ascii=False)
+        titles = re.findall(r'^\s*Title: (.*)$', prompt, re.M)
+        if '--- PAPER' in prompt:
+            return json.dumps([dict(index=i + 1, **self._summary(t)) for i, t in enumerate(titles)], ensure_ascii=False)
+        return json.dumps(self._summary(titles[0] if titles else ''), ensure_ascii=False)
+
+    @staticmethod
+    def _summary(title):
+        return {
+            "summary_ja": f"「{title[:60]}」についての要約です。提案手法は既存手法を上回る性能を示しました。",
+            "contribution_ja": f"「{title[:40]}」の新しい手法を提案した。",
+        }
+
+    @staticmethod
+    def _slide(prompt):
+        return {
+            "title_en": "Fake Paper", "title_ja": "フェイク論文", "authors": "A. Author et al.",
+            "affiliations": "Fake University", "summary": "要約", "novelty": "新規性",
+            "method_key": "手法", "validation": "検証", "discussion": "議論", "next_paper": "次の論文",
+            "figure1": {"page_index": 0, "bbox": [100, 100, 500, 900], "description": "概要図"},
+            "figure2": {"page_index": 1, "bbox": [100, 100, 500, 900], "description": "結果"},
+        }
+
+    def _corrupt(self, text):
+        try:
+            data = json.loads(text)
+        except ValueError:
+            return text[: len(text) // 2]
+        if isinstance(data, list) and len(data) > 1:
+            return json.dumps(data[:-1], ensure_ascii=False) # Length mismatch
+        return text[: len(text) // 2] # Truncated JSON
+
+    # --- files / batches ---
+
+    def _path(self, kind, name):
+        return os.path.join(self.directory, kind, name.split('/')[-1])
+
+    def upload_file(self, path, mime_type):
+        self._count("uploads")
+        name = f"files/fake-{uuid.uuid4().hex[:12]}"
+        target = self._path('files', name)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(path, 'rb') as src, open(target, 'wb') as dst:
+            dst.write(src.read())
+        return name
+
+    def create_batch(self, model_name, src):
+        self._count("batches")
+        name = f"batches/fake-{uuid.uuid4().hex[:12]}"
+        target = self._path('batches', name)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, 'w') as f:
+            json.dump({"src": src, "model": model_name, "created_at": time.time()}, f)
+        return BatchJob(name, 'JOB_STATE_PENDING')
+
+    def get_batch(self, name):
+        with open(self._path('batches', name), 'r') as f:
+            job = json.load(f)
+        if time.time() - job['created_at'] < self.batch_seconds:
+            return BatchJob(name, 'JOB_STATE_RUNNING')
+
+        output = f"files/{name.split('/')[-1]}-output"
+        output_path = self._path('files', output)
+        if not os.path.exists(output_path):
+            tmp_path = f"{output_path}.tmp"
+            with open(self._path('files', job['src']), 'r', encoding='utf-8') as src, \
+                 open(tmp_path, 'w', encoding='utf-8') as dst:
+                for line in src:
+                    if not line.strip():
+                        continue
+                    req = json.loads(line)
+                    dst.write(json.dumps(self._batch_response(req), ensure_ascii=False) + '\n')
+            os.replace(tmp_path, output_path)
+        return BatchJob(name, 'JOB_STATE_SUCCEEDED', output)
+
+    def _batch_response(self, req):
+        texts = []
+        for msg in req.get('body', {}).get('messages', []):
+            content = msg.get('content')
+            if isinstance(content, str):
+                texts.append(content)
+            elif isinstance(content, list):
+                texts.extend(c.get('text', '') for c in content if c.get('type') == 'text')
+        text = self.respond('\n'.join(texts))
+        if self._roll(self.malformed_rate):
+            self._count("malformed")
+            text = self._corrupt(text)
+        return {
+            "custom_id": req.get('custom_id'),
+            "response": {"body": {"choices": [{"message": {"role": "assistant", "content": text}}]}},
+        }
+
+    def download_file(self, name):
+        with open(self._path('files', name), 'rb') as f:
+            while True:
+                chunk = f.read(DOWNLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+def get_backend(api_key=None):
+    """Returns the backend selected by LLM_BACKEND (shared per process)."""
+    kind = os.environ.get("LLM_BACKEND", "gemini")
+    with _backends_lock:
+        key = (kind, api_key)
+        if key not in _backends:
+            if kind == 'fake':
+                _backends[key] = FakeBackend.from_env()
+            elif kind == 'gemini':
+                _backends[key] = GeminiBackend(api_key)
+            else:
+                raise ValueError(f"Unknown LLM_BACKEND: {kind}")
+        return _backends[key]
@@ -50,13 +50,14 @@ def run_daily_job():
     
     if enable_sync:
         print("!!! EMERGENCY FALLBACK: Running Synchronous Summarization !!!")
-        newly_summarized = summarizer.summarize_and_translate(papers_to_process)
-        # Merge back
-        summarized_map = {p['id']: p for p in newly_summarized}
-        for i, p in enumerate(processed_papers):
-            if p['id'] in summarized_map:
-                processed_papers[i] = summarized_map[p['id']]
+        # Save the fetch first, then checkpoint every finished batch to the
+        # day's journal. A restarted job reloads the journal and only
+        # summarizes what is still missing.
+        storage.save_daily_data(processed_papers, date_str)
+        for done in summarizer.iter_summaries(papers_to_process):
+            storage.append_daily_updates(done, date_str)
         
+        # Papers were summarized in place; compact the journal into the day file
         print(f"Saving data to {date_str}...")
         storage.save_daily_data(processed_papers, date_str)
     else:
@@ -66,9 +67,14 @@ def run_daily_job():
         storage.save_daily_data(processed_papers, date_str)
         
         bp = BatchProcessor()
-        job_id = bp.submit_summary_batch(date_str, papers_to_process)
-        print(f"Batch job submitted successfully: {job_id}")
-        print("Result will be picked up by monitor_service once completed (up to 24h).")
+        try:
+            job_id = bp.submit_summary_batch(date_str, papers_to_process)
+        finally:
+            # Summaries served from the cache were filled in during submission
+            storage.save_daily_data(processed_papers, date_str)
+        if job_id:
+            print(f"Batch job submitted successfully: {job_id}")
+            print("Result will be picked up by monitor_service once completed (up to 24h).")
 
     print("Job complete.")
 
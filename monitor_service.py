@@ -1,33 +1,28 @@
 import time
 import datetime
-import requests
-from bs4 import BeautifulSoup
-import os
 import main_job
 import re
 import storage
 import scraper
+import summary_cache
 from batch_processor import BatchProcessor
 
 # Check every 30 minutes
 CHECK_INTERVAL = 30 * 60 
-ARXIV_URL = "https://arxiv.org/list/cs.CV/new"
-DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
 
 def get_current_arxiv_header():
+    """
+    Polls the listing with a conditional GET.
+    Returns (header_text, listing_soup), or (None, None) on error.
+    """
     try:
-        response = requests.get(ARXIV_URL)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.content, 'html.parser')
-        h3s = soup.find_all('h3')
-        for h3 in h3s:
-            text = h3.text.strip()
-            if "Showing new listings" in text:
-                return text
-        return None
+        soup, changed = scraper.fetch_listing()
+        if not changed:
+            print("Listing unchanged since last poll (304).")
+        return scraper.get_listing_header(soup), soup
     except Exception as e:
         print(f"Error checking arXiv: {e}")
-        return None
+        return None, None
 
 def parse_date_from_header(header_text):
     try:
@@ -38,21 +33,18 @@ def parse_date_from_header(header_text):
         print(f"Error parsing date from header '{header_text}': {e}")
         return None
 
-def is_json_complete(json_path):
-    """Checks if the JSON file exists and has summarized content."""
-    if not os.path.exists(json_path):
-        return False
+def is_day_complete(date_str):
+    """Checks if the day's data exists (in either storage backend) and has summarized content."""
     try:
-        with open(json_path, 'r') as f:
-            data = json.load(f)
-            if not data: return False
-            # Check if at least some papers have valid summaries
-            # (April 6th is currently blank, so this will return False)
-            summarized_count = 0
-            for p in data[:10]: # Check first 10
-                if "summary_ja" in p and p["summary_ja"] != "要約生成エラー" and p["summary_ja"].strip() != "":
-                    summarized_count += 1
-            return summarized_count >= 1
+        data = storage.load_daily_data(date_str)
+        if not data: return False
+        # Check if at least some papers have valid summaries
+        # (April 6th is currently blank, so this will return False)
+        summarized_count = 0
+        for p in data[:10]: # Check first 10
+            if "summary_ja" in p and p["summary_ja"] != "要約生成エラー" and p["summary_ja"].strip() != "":
+                summarized_count += 1
+        return summarized_count >= 1
     except:
         return False
 
@@ -71,15 +63,13 @@ def monitor_loop():
             print(f"Error checking batch jobs: {e}")
 
         # 2. Check arXiv for new listings
-        current_header = get_current_arxiv_header()
+        current_header, listing = get_current_arxiv_header()
         
         if current_header:
             target_date_str = parse_date_from_header(current_header)
             
             if target_date_str:
-                json_path = os.path.join(DATA_DIR, f"{target_date_str}.json")
-                
-                if is_json_complete(json_path):
+                if is_day_complete(target_date_str):
                     print(f"Data for {target_date_str} is complete.")
                 else:
                     # Check if a batch job is already in progress for this date
@@ -92,7 +82,7 @@ def monitor_loop():
                             existing_data = storage.load_daily_data(target_date_str)
                             
                             if not existing_data:
-                                fetched_papers, date_str = scraper.fetch_papers()
+                                fetched_papers, date_str = scraper.fetch_papers(listings={scraper.ARXIV_CATEGORIES[0]: listing})
                                 if fetched_papers:
                                     papers = fetched_papers
                                     storage.save_daily_data(papers, date_str)
@@ -107,10 +97,14 @@ def monitor_loop():
                                 
                                 if to_process:
                                     print(f"Submitting Batch Job for {len(to_process)} missing papers on {target_date_str}...")
-                                    job_id = bp.submit_summary_batch(target_date_str, to_process)
+                                    try:
+                                        job_id = bp.submit_summary_batch(target_date_str, to_process)
+                                    finally:
+                                        # Persist summaries served from the cache during submission
+                                        storage.save_daily_data(papers, target_date_str)
                                     if job_id:
                                         print(f"Summary batch job submitted: {job_id}")
-                                    else:
+                                    elif any(not summary_cache.is_valid_summary(p.get("summary_ja")) for p in to_process):
                                         print("Batch submission failed.")
                                 else:
                                     print("No papers actually need processing.")
@@ -124,7 +118,7 @@ def monitor_loop():
         
         # Also check for 4/6 repair if it's not complete
         repair_date = "2026-04-06"
-        if not is_json_complete(os.path.join(DATA_DIR, f"{repair_date}.json")):
+        if not is_day_complete(repair_date):
             if not bp.is_job_running('summary', repair_date):
                 print(f"Repairing {repair_date} via Batch...")
                 # In a real scenario, we'd load the papers and submit.
@@ -133,6 +127,23 @@ def monitor_loop():
             else:
                 print(f"Repair batch for {repair_date} is running.")
 
-        time.sleep(CHECK_INTERVAL)
+        # Sleep until the next arXiv check, waking up for job polls that fall due sooner
+        next_check = time.time() + CHECK_INTERVAL
+        while True:
+            remaining = next_check - time.time()
+            try:
+                wait = bp.seconds_until_next_poll()
+            except Exception as e:
+                print(f"Error reading the batch poll schedule: {e}")
+                wait = None
+            if wait is None or wait >= remaining:
+                time.sleep(max(remaining, 0))
+                break
+            time.sleep(max(wait, 1))
+            try:
+                bp.check_jobs()
+                bp.process_completed_jobs(storage)
+            except Exception as e:
+                print(f"Error checking batch jobs: {e}")
 if __name__ == "__main__":
     monitor_loop()
@@ -0,0 +1,215 @@
+"""
+SQLite storage backend for papers, daily listings and favorites.
+
+Selected with STORAGE_BACKEND=sqlite; storage.py keeps its function
+signatures and delegates here. Papers are keyed by arXiv id, so reading
+or updating one paper is an index lookup however large the archive grows.
+
+    python paper_store.py import          # one-shot import of data/*.json, *.dayz and favorites
+    python paper_store.py get arXiv:2601.00001
+"""
+import os
+import re
+import json
+import time
+import sqlite3
+import argparse
+import contextlib
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+DB_PATH = os.path.join(DATA_DIR, 'papers.sqlite3')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS papers (
+    id         TEXT PRIMARY KEY,
+    data       TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS days (
+    date        TEXT PRIMARY KEY,
+    saved_at    REAL NOT NULL,
+    paper_count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS listings (
+    date     TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    paper_id TEXT NOT NULL,
+    PRIMARY KEY (date, position)
+);
+CREATE INDEX IF NOT EXISTS idx_listings_paper ON listings (paper_id);
+CREATE TABLE IF NOT EXISTS favorites (
+    user     TEXT NOT NULL,
+    paper_id TEXT NOT NULL,
+    saved_at TEXT NOT NULL,
+    data     TEXT NOT NULL,
+    PRIMARY KEY (user, paper_id)
+);
+CREATE INDEX IF NOT EXISTS idx_favorites_saved ON favorites (user, saved_at);
+"""
+
+UPSERT_PAPER = ("INSERT INTO papers (id, data, updated_at) VALUES (?, ?, ?)"
+                " ON CONFLICT(id) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at")
+
+class PaperStore:
+    def __init__(self, db_path=DB_PATH):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextlib.contextmanager
+    def _connect(self):
+        """One short-lived connection per operation; commits on success."""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    # --- daily listings ---
+
+    def save_day(self, papers, date_str):
+        """Replaces the day's listing with `papers` (in order) and upserts every paper."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("DELETE FROM listings WHERE date = ?", (date_str,))
+            conn.executemany(UPSERT_PAPER, [(p['id'], json.dumps(p, ensure_ascii=False), now) for p in papers])
+            conn.executemany("INSERT INTO listings (date, position, paper_id) VALUES (?, ?, ?)",
+                             [(date_str, i, p['id']) for i, p in enumerate(papers)])
+            conn.execute("INSERT OR REPLACE INTO days (date, saved_at, paper_count) VALUES (?, ?, ?)",
+                         (date_str, now, len(papers)))
+
+    def update_papers(self, papers, date_str):
+        """
+        Upserts individual paper records. Papers not yet listed on `date_str`
+        are appended to that day, like ids unknown to a day's journal.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.executemany(UPSERT_PAPER, [(p['id'], json.dumps(p, ensure_ascii=False), now) for p in papers])
+            for p in papers:
+                listed = conn.execute("SELECT 1 FROM listings WHERE date = ? AND paper_id = ?",
+                                      (date_str, p['id'])).fetchone()
+                if listed:
+                    continue
+                position = conn.execute("SELECT COALESCE(MAX(position) + 1, 0) FROM listings WHERE date = ?",
+                                        (date_str,)).fetchone()[0]
+                conn.execute("INSERT INTO listings (date, position, paper_id) VALUES (?, ?, ?)",
+                             (date_str, position, p['id']))
+                conn.execute("INSERT INTO days (date, saved_at, paper_count) VALUES (?, ?, 1)"
+                             " ON CONFLICT(date) DO UPDATE SET paper_count = paper_count + 1", (date_str, now))
+
+    def load_day(self, date_str):
+        """Returns the day's papers in listing order, or None if the day was never saved."""
+        with self._connect() as conn:
+            if not conn.execute("SELECT 1 FROM days WHERE date = ?", (date_str,)).fetchone():
+                return None
+            rows = conn.execute(
+                "SELECT p.data FROM listings l JOIN papers p ON p.id = l.paper_id"
+                " WHERE l.date = ? ORDER BY l.position", (date_str,)).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def available_dates(self):
+        with self._connect() as conn:
+            return [row[0] for row in conn.execute("SELECT date FROM days ORDER BY date DESC")]
+
+    def get_paper(self, paper_id):
+        with self._connect() as conn:
+            row = conn.execute("SELECT data FROM papers WHERE id = ?", (paper_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    # --- favorites ---
+
+    def get_favorites(self, username):
+        """
+        Newest first, like favorites.json. Favorites are references; the
+        paper content is joined in from the papers table (legacy full
+        records are returned as stored if the paper is unknown).
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT f.data, p.data FROM favorites f LEFT JOIN papers p ON p.id = f.paper_id"
+                " WHERE f.user = ? ORDER BY f.saved_at DESC", (username,)).fetchall()
+        favorites = []
+        for fav_data, paper_data in rows:
+            fav = json.loads(fav_data)
+            if paper_data:
+                paper = json.loads(paper_data)
+                paper.update({k: fav[k] for k in ('id', 'list_date', 'saved_at') if fav.get(k)})
+                fav = paper
+            favorites.append(fav)
+        return favorites
+
+    def add_favorite(self, username, paper):
+        """Returns False if the paper is already a favorite. `paper` must carry 'saved_at'."""
+        with self._connect() as conn:
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO favorites (user, paper_id, saved_at, data) VALUES (?, ?, ?, ?)",
+                (username, paper.get('id'), paper.get('saved_at', ''), json.dumps(paper, ensure_ascii=False)))
+            return cur.rowcount == 1
+
+    def delete_favorite(self, username, paper_id):
+        with self._connect() as conn:
+            cur = conn.execute("DELETE FROM favorites WHERE user = ? AND paper_id = ?", (username, paper_id))
+            return cur.rowcount > 0
+
+    def delete_favorites_by_date(self, username, date_str):
+        """Deletes favorites whose saved_at starts with date_str ('YYYY-MM-DD')."""
+        with self._connect() as conn:
+            cur = conn.execute("DELETE FROM favorites WHERE user = ? AND saved_at >= ? AND saved_at < ?",
+                               (username, date_str, date_str + '\uffff'))
+            return cur.rowcount > 0
+
+def import_json(store, data_dir=None, users_dir=None):
+    """Imports every day file (json or compact, with its journal) and every user's favorites."""
+    import storage
+    import day_format
+    data_dir = data_dir or storage.DATA_DIR
+    users_dir = users_dir or storage.USERS_DIR
+    date_pattern = re.compile(r'^(\d{4}-\d{2}-\d{2})(\.json|' + re.escape(day_format.EXTENSION) + ')$')
+
+    days = 0
+    for name in sorted(os.listdir(data_dir)) if os.path.exists(data_dir) else []:
+        match = date_pattern.match(name)
+        if not match:
+            continue
+        date_str = match.group(1)
+        path = os.path.join(data_dir, name)
+        if match.group(2) == day_format.EXTENSION:
+            data = day_format.read_day(path)
+        else:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        store.save_day(storage._apply_journal(data, date_str) or [], date_str)
+        days += 1
+
+    favorites = 0
+    for username in sorted(os.listdir(users_dir)) if os.path.exists(users_dir) else []:
+        snapshot = os.path.join(users_dir, username, 'favorites.json')
+        log_path = os.path.join(users_dir, username, 'favorites.log.jsonl')
+        if not (os.path.exists(snapshot) or os.path.exists(log_path)):
+            continue
+        # Changes since the last compaction exist only in the log
+        user_favorites, _ = storage._read_favorites_files(snapshot, log_path)
+        for paper in user_favorites.values():
+            favorites += store.add_favorite(username, paper)
+    return days, favorites
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('import', help='Import existing JSON day files and favorites')
+    get = sub.add_parser('get', help='Print one paper by arXiv id')
+    get.add_argument('paper_id')
+    args = parser.parse_args()
+
+    store = PaperStore()
+    if args.command == 'import':
+        days, favorites = import_json(store)
+        print(f"Imported {days} days and {favorites} favorites into {store.db_path}.")
+    else:
+        paper = store.get_paper(args.paper_id)
+        print(json.dumps(paper, ensure_ascii=False, indent=2) if paper else f"{args.paper_id} not found.")
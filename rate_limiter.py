@@ -0,0 +1,67 @@
+import time
+import threading
+
+# Rough heuristic (~4 characters per token) used for rate-limit accounting
+CHARS_PER_TOKEN = 4
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+class TokenBucketLimiter:
+    """
+    Thread-safe requests-per-minute / tokens-per-minute limiter shared by all
+    in-flight API calls. Both buckets refill continuously; `acquire` blocks
+    until one request and the estimated tokens are available.
+    `pause` lets a worker that received a retry-after hint hold back every
+    other worker until the quota window has passed.
+    """
+    def __init__(self, rpm, tpm=None):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.cond = threading.Condition()
+        self.request_tokens = float(rpm)
+        self.input_tokens = float(tpm) if tpm else 0.0
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.waited = 0.0 # Total seconds callers spent blocked
+
+    def _refill(self, now):
+        elapsed = now - self.updated
+        self.updated = now
+        self.request_tokens = min(self.rpm, self.request_tokens + elapsed * self.rpm / 60.0)
+        if self.tpm:
+            self.input_tokens = min(self.tpm, self.input_tokens + elapsed * self.tpm / 60.0)
+
+    def acquire(self, tokens=0):
+        """Blocks until a request slot and `tokens` input tokens are available."""
+        # A single request larger than the whole bucket would never fit
+        tokens = min(tokens, self.tpm) if self.tpm else 0
+        start = time.monotonic()
+        with self.cond:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self.paused_until:
+                    wait = self.paused_until - now
+                else:
+                    missing_req = 1.0 - self.request_tokens
+                    missing_tok = tokens - self.input_tokens if self.tpm else 0.0
+                    if missing_req <= 0 and missing_tok <= 0:
+                        self.request_tokens -= 1.0
+                        if self.tpm:
+                            self.input_tokens -= tokens
+                        self.waited += now - start
+                        return
+                    wait = max(missing_req * 60.0 / self.rpm,
+                               missing_tok * 60.0 / self.tpm if self.tpm else 0.0)
+                self.cond.wait(timeout=max(wait, 0.01))
+
+    def pause(self, seconds):
+        """Holds back all callers for `seconds` (e.g. from a retry-after hint)."""
+        with self.cond:
+            now = time.monotonic()
+            self._refill(now)
+            self.paused_until = max(self.paused_until, now + seconds)
+            # Don't let the whole bucket burst out the moment the pause ends
+            self.request_tokens = min(self.request_tokens, 1.0)
+            self.cond.notify_all()
@@ -1,9 +1,85 @@
+import os
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from bs4 import BeautifulSoup, SoupStrainer
 import re
+import time
 import datetime
+import threading
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+from disk_cache import DiskCache
 
-ARXIV_URL = "https://arxiv.org/list/cs.CV/new"
+# ARXIV_BASE_URL can point at a local stand-in server (see benchmarks/).
+ARXIV_BASE_URL = os.environ.get("ARXIV_BASE_URL", "https://arxiv.org").rstrip('/')
+ARXIV_LIST_URL = ARXIV_BASE_URL + "/list/{category}/new"
+
+# Categories scraped by a daily run. The first one is the primary category:
+# its listing header decides the list date the monitor tracks.
+ARXIV_CATEGORIES = [c.strip() for c in os.environ.get("ARXIV_CATEGORIES", "cs.CV,cs.LG,cs.RO,eess.IV").split(',') if c.strip()]
+
+# Abstract pages are fetched concurrently over one keep-alive session.
+# FETCH_CONCURRENCY caps in-flight requests; FETCH_DELAY is the minimum gap
+# (seconds) between two request starts against the same host.
+FETCH_CONCURRENCY = int(os.environ.get("ARXIV_FETCH_CONCURRENCY", "4"))
+FETCH_DELAY = float(os.environ.get("ARXIV_FETCH_DELAY", "0.5"))
+FETCH_TIMEOUT = 30
+
+# Listing pages are parsed with lxml when it is installed. Only the <h3>
+# headers and the <dl> entry blocks are materialised; navigation, scripts and
+# footers are skipped by the strainer.
+try:
+    import lxml  # noqa: F401
+    LISTING_PARSER = 'lxml'
+except ImportError:
+    LISTING_PARSER = 'html.parser'
+LISTING_STRAINER = SoupStrainer(['h3', 'dl'])
+# While parsing, bs4 matches class_ against the raw attribute string
+# ("abstract mathjax"), so strain on the tag and pick the class afterwards
+ABSTRACT_STRAINER = SoupStrainer('blockquote')
+
+# Abstracts fetched from abs pages are cached on disk by arXiv id + version,
+# so re-runs (crash recovery, monitor retries) don't download them again.
+ABSTRACT_CACHE_DIR = os.path.join(os.path.dirname(__file__), 'data', 'abstract_cache')
+ABSTRACT_CACHE_TTL = float(os.environ.get("ARXIV_ABSTRACT_CACHE_TTL", str(3 * 24 * 3600)))
+ABSTRACT_CACHE_MAX_BYTES = int(os.environ.get("ARXIV_ABSTRACT_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+abstract_cache = DiskCache(ABSTRACT_CACHE_DIR, ttl=ABSTRACT_CACHE_TTL, max_bytes=ABSTRACT_CACHE_MAX_BYTES)
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session():
+    """Returns the shared keep-alive HTTP session used for all arXiv requests."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(FETCH_CONCURRENCY, 1))
+            _session.mount('https://', adapter)
+            _session.mount('http://', adapter)
+        return _session
+
+class HostThrottle:
+    """Spaces out request starts per host by at least `delay` seconds."""
+    def __init__(self, delay):
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.next_slot = {}
+
+    def wait(self, url):
+        if self.delay <= 0:
+            return
+        host = urlparse(url).netloc
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot.get(host, now))
+            self.next_slot[host] = slot + self.delay
+        if slot > now:
+            time.sleep(slot - now)
+
+def parse_listing_document(content, parser=None):
+    """Parses listing HTML, keeping only the <h3> headers and <dl> entries."""
+    return BeautifulSoup(content, parser or LISTING_PARSER, parse_only=LISTING_STRAINER)
 
 def parse_date_from_header(header_text):
     """
@@ -20,25 +96,156 @@ def parse_date_from_header(header_text):
         print(f"Error parsing date from header '{header_text}': {e}")
         return None
 
-def fetch_papers():
+class ListingFetcher:
     """
-    Fetches the list of new papers from arXiv cs.CV.
-    Only includes "New submissions" and "Cross-lists". Ignores "Replacements".
-    Uses the counts provided in the headers to determine how many papers to fetch.
-    Returns: (papers, date_str)
-        papers: List of paper dictionaries.
-        date_str: YYYY-MM-DD string representing the arXiv list date.
+    Downloads a listing page with ETag / If-Modified-Since revalidation and
+    keeps the parsed document, so an unchanged page costs a 304 and no parse.
     """
-    try:
-        response = requests.get(ARXIV_URL)
+    def __init__(self, url):
+        self.url = url
+        self.etag = None
+        self.last_modified = None
+        self.soup = None
+
+    def fetch(self):
+        """
+        Returns (soup, changed). On a 304 the previously parsed document is
+        returned with changed=False. Raises requests.RequestException.
+        """
+        headers = {}
+        if self.soup is not None:
+            if self.etag:
+                headers['If-None-Match'] = self.etag
+            if self.last_modified:
+                headers['If-Modified-Since'] = self.last_modified
+
+        response = get_session().get(self.url, headers=headers, timeout=FETCH_TIMEOUT)
+        if response.status_code == 304 and self.soup is not None:
+            return self.soup, False
         response.raise_for_status()
-    except requests.RequestException as e:
-        print(f"Error fetching URL: {e}")
-        return [], None
 
-    soup = BeautifulSoup(response.content, 'html.parser')
-    
-    # 1. Determine how many papers to fetch by parsing headers
+        self.soup = parse_listing_document(response.content)
+        self.etag = response.headers.get('ETag')
+        self.last_modified = response.headers.get('Last-Modified')
+        return self.soup, True
+
+_listing_fetchers = {}
+_listing_fetchers_lock = threading.Lock()
+
+def fetch_listing(category=None):
+    """
+    Revalidates the listing of `category` (default: the primary category).
+    Returns (soup, changed); see ListingFetcher.fetch.
+    """
+    category = category or ARXIV_CATEGORIES[0]
+    with _listing_fetchers_lock:
+        fetcher = _listing_fetchers.get(category)
+        if fetcher is None:
+            fetcher = ListingFetcher(ARXIV_LIST_URL.format(category=category))
+            _listing_fetchers[category] = fetcher
+    return fetcher.fetch()
+
+def get_listing_header(soup):
+    """Returns the "Showing new listings for ..." header text, or None."""
+    for h3 in soup.find_all('h3'):
+        text = h3.text.strip()
+        if "Showing new listings" in text:
+            return text
+    return None
+
+def abstract_cache_key(paper):
+    """
+    Cache key for a paper's abstract: bare arXiv id plus version.
+    Listing entries carry no version suffix; new submissions and cross-lists
+    announced on a listing are first versions, so "v1" is assumed.
+    """
+    arxiv_id = (paper.get('id') or paper['url'].rstrip('/').split('/abs/')[-1]).replace('arXiv:', '').strip()
+    if not re.search(r'v\d+$', arxiv_id):
+        arxiv_id += 'v1'
+    return arxiv_id
+
+def _fetch_abstract(session, throttle, paper):
+    """Fetches one abs page and stores its abstract on the paper dict."""
+    throttle.wait(paper['url'])
+    paper_resp = session.get(paper['url'], timeout=FETCH_TIMEOUT)
+    paper_resp.raise_for_status()
+    paper_soup = BeautifulSoup(paper_resp.content, LISTING_PARSER, parse_only=ABSTRACT_STRAINER)
+    abs_block = paper_soup.find('blockquote', class_='abstract')
+    if not abs_block:
+        raise ValueError("no abstract block on the abs page")
+    paper['abstract'] = abs_block.text.replace('Abstract:', '').strip()
+    abstract_cache.put(abstract_cache_key(paper), paper['abstract'])
+
+def fetch_abstracts(papers, concurrency=None, delay=None):
+    """
+    Fills in 'abstract' for every paper with a 'url', using a bounded thread
+    pool over the shared session. Papers are updated in place, so listing
+    order is preserved. Abstracts already in abstract_cache are not
+    downloaded again. Returns the ids of papers whose fetch failed.
+    """
+    concurrency = FETCH_CONCURRENCY if concurrency is None else concurrency
+    delay = FETCH_DELAY if delay is None else delay
+    targets = []
+    for p in papers:
+        if 'url' not in p:
+            continue
+        cached = abstract_cache.get(abstract_cache_key(p))
+        if cached:
+            p['abstract'] = cached
+        else:
+            targets.append(p)
+
+    stats = abstract_cache.stats()
+    print(f"Abstract cache: {stats['hits']} hits, {stats['misses']} misses")
+    if not targets:
+        return []
+
+    session = get_session()
+    throttle = HostThrottle(delay)
+    failed = []
+    with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as executor:
+        futures = [(p, executor.submit(_fetch_abstract, session, throttle, p)) for p in targets]
+        for paper, future in futures:
+            try:
+                future.result()
+            except Exception as e:
+                print(f"Error fetching abstract for {paper.get('id')}: {e}")
+                failed.append(paper.get('id') or paper['url'])
+    return failed
+
+def _parse_entry(dt, dd):
+    """Builds a paper dict from one listing <dt>/<dd> pair."""
+    paper = {}
+    anchor = dt.find('a', title='Abstract')
+    if anchor:
+        paper['id'] = anchor.text.strip()
+        paper['url'] = f"{ARXIV_BASE_URL}{anchor['href']}"
+
+    title_div = dd.find('div', class_='list-title')
+    if title_div:
+        paper['title'] = title_div.text.replace('Title:', '').strip()
+
+    authors_div = dd.find('div', class_='list-authors')
+    if authors_div:
+        authors_text = authors_div.text.replace('Authors:', '').strip()
+        paper['authors'] = ' '.join(authors_text.split())
+
+    # The listing carries the abstract as <p class="mathjax"> inside the <dd>
+    abs_p = dd.find('p', class_='mathjax') or dd.find('p')
+    if abs_p:
+        abstract = ' '.join(abs_p.text.split())
+        if abstract:
+            paper['abstract'] = abstract
+    return paper
+
+def parse_listing(soup):
+    """
+    Extracts papers from a parsed /list/<category>/new page in one pass.
+    Each paper carries id, url, title, authors, abstract (when the listing
+    has it) and 'announce_type' ('new' or 'cross').
+    Returns: (papers, date_str)
+    """
+    # 1. Determine how many papers to take by parsing headers
     total_new = 0
     total_cross = 0
     arxiv_date = None
@@ -84,38 +291,105 @@ def fetch_papers():
         for dt, dd in zip(dts, dds):
             if len(papers) >= total_to_fetch:
                 break
-                
-            paper = {}
-            anchor = dt.find('a', title='Abstract')
-            if anchor:
-                paper['id'] = anchor.text.strip()
-                paper['url'] = f"https://arxiv.org{anchor['href']}"
-            
-            title_div = dd.find('div', class_='list-title')
-            if title_div:
-                paper['title'] = title_div.text.replace('Title:', '').strip()
-                
-            authors_div = dd.find('div', class_='list-authors')
-            if authors_div:
-                authors_text = authors_div.text.replace('Authors:', '').strip()
-                paper['authors'] = ' '.join(authors_text.split())
-
-            if 'url' in paper:
-                try:
-                    paper_resp = requests.get(paper['url'])
-                    if paper_resp.status_code == 200:
-                        paper_soup = BeautifulSoup(paper_resp.content, 'html.parser')
-                        abs_block = paper_soup.find('blockquote', class_='abstract')
-                        if abs_block:
-                            paper['abstract'] = abs_block.text.replace('Abstract:', '').strip()
-                except Exception as e:
-                    print(f"Error fetching abstract for {paper.get('id')}: {e}")
 
+            paper = _parse_entry(dt, dd)
+            # Cross-lists are marked "(cross-list from ...)" in the <dt>;
+            # the header counts cover layouts without the marker.
+            if 'cross-list' in dt.text or 0 < total_new <= len(papers):
+                paper['announce_type'] = 'cross'
+            else:
+                paper['announce_type'] = 'new'
             papers.append(paper)
         
         if len(papers) >= total_to_fetch:
             break
 
+    return papers, arxiv_date
+
+def merge_listings(listings):
+    """
+    Merges per-category paper lists by arXiv id, keeping first-seen order.
+    `listings` is a list of (category, papers). Each merged paper records every
+    category it appeared in under 'categories'; a paper that is a new
+    submission in any of them keeps announce_type 'new'.
+    """
+    merged = {}
+    for category, papers in listings:
+        for paper in papers:
+            key = paper.get('id') or paper.get('url')
+            existing = merged.get(key)
+            if existing is None:
+                paper['categories'] = [category]
+                merged[key] = paper
+                continue
+            if category not in existing['categories']:
+                existing['categories'].append(category)
+            if paper.get('announce_type') == 'new':
+                existing['announce_type'] = 'new'
+            if not existing.get('abstract') and paper.get('abstract'):
+                existing['abstract'] = paper['abstract']
+    return list(merged.values())
+
+def _fetch_category(category):
+    soup, _ = fetch_listing(category)
+    return soup
+
+def fetch_papers(categories=None, listings=None, concurrency=None, delay=None):
+    """
+    Fetches the new papers of every category in `categories` (default:
+    ARXIV_CATEGORIES) and merges cross-listed papers by arXiv id.
+    Only includes "New submissions" and "Cross-lists". Ignores "Replacements".
+    Listings are downloaded concurrently and everything is read from them;
+    abs pages are only fetched (see fetch_abstracts) for entries that lack
+    an abstract.
+    `listings` maps category -> already-parsed listing document (e.g. from the
+    monitor's poll via fetch_listing); those categories are not fetched again.
+    `concurrency` and `delay` override FETCH_CONCURRENCY and FETCH_DELAY.
+    Returns: (papers, date_str)
+        papers: List of paper dictionaries.
+        date_str: YYYY-MM-DD string representing the arXiv list date of the
+                  first category.
+    """
+    categories = list(categories or ARXIV_CATEGORIES)
+    listings = dict(listings or {})
+
+    to_fetch = [c for c in categories if c not in listings]
+    if to_fetch:
+        with ThreadPoolExecutor(max_workers=len(to_fetch)) as executor:
+            futures = {c: executor.submit(_fetch_category, c) for c in to_fetch}
+            for category, future in futures.items():
+                try:
+                    listings[category] = future.result()
+                except requests.RequestException as e:
+                    print(f"Error fetching listing for {category}: {e}")
+
+    parsed = []
+    arxiv_date = None
+    for category in categories:
+        if category not in listings:
+            continue
+        print(f"Parsing {category} listing...")
+        papers, date_str = parse_listing(listings[category])
+        if arxiv_date is None:
+            arxiv_date = date_str
+        elif date_str != arxiv_date:
+            print(f"Warning: {category} lists {date_str}, expected {arxiv_date}.")
+        parsed.append((category, papers))
+
+    if not parsed:
+        return [], None
+
+    total_entries = sum(len(p) for _, p in parsed)
+    papers = merge_listings(parsed)
+    print(f"Merged {total_entries} entries from {len(parsed)} categories into {len(papers)} unique papers.")
+
+    missing = [p for p in papers if not p.get('abstract')]
+    if missing:
+        print(f"{len(missing)} entries have no abstract in the listing. Fetching abs pages...")
+        failed = fetch_abstracts(missing, concurrency=concurrency, delay=delay)
+        if failed:
+            print(f"Warning: Could not fetch abstracts for {len(failed)} papers: {', '.join(failed)}")
+
     print(f"Actually fetched: {len(papers)} papers.")
     return papers, arxiv_date
 
@@ -1,11 +1,13 @@
 import os
 import requests
 import fitz  # PyMuPDF
-import google.generativeai as genai
+import llm_backend
+from disk_cache import DiskCache
 from PIL import Image
 import json
 import io
 import time
+import base64
 import zipfile
 import re
 from reportlab.pdfgen import canvas
@@ -17,14 +19,43 @@ from reportlab.platypus import Paragraph, Frame, KeepInFrame
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.enums import TA_LEFT
 
+# Pages rendered for a slide batch are kept until (and a while after) the
+# batch completes, so figures are cropped without downloading again
+PAGE_CACHE_DIR = os.path.join(os.path.dirname(__file__), 'data', 'page_cache')
+PAGE_CACHE_TTL = float(os.environ.get("PAGE_CACHE_TTL_HOURS", "72")) * 3600
+PAGE_CACHE_MAX_BYTES = int(os.environ.get("PAGE_CACHE_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))
+page_cache = DiskCache(PAGE_CACHE_DIR, ttl=PAGE_CACHE_TTL, max_bytes=PAGE_CACHE_MAX_BYTES)
+
+def page_cache_key(paper_id, num_pages=4, dpi=150, quality=80):
+    return f"{paper_id}|pages={num_pages}|dpi={dpi}|q={quality}"
+
+def decode_pages(pages):
+    """Turns base64 JPEG strings from render_pages_jpeg back into PIL Images."""
+    return [Image.open(io.BytesIO(base64.b64decode(page))) for page in pages]
+
+def render_pages_jpeg(pdf_bytes, num_pages=4, dpi=150, quality=80):
+    """
+    Renders the first pages of a PDF and returns them as base64 JPEG strings.
+    Module-level so batch preparation can run it in a process pool.
+    """
+    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+    pages = []
+    try:
+        for i in range(min(num_pages, len(doc))):
+            pix = doc.load_page(i).get_pixmap(dpi=dpi)
+            img = Image.open(io.BytesIO(pix.tobytes()))
+            buffered = io.BytesIO()
+            img.save(buffered, format="JPEG", quality=quality)
+            pages.append(base64.b64encode(buffered.getvalue()).decode())
+    finally:
+        doc.close()
+    return pages
+
 class SlideContentExtractor:
     def __init__(self, api_key=None):
-        self.api_key = api_key or os.environ.get("GEMINI_API_KEY")
-        if not self.api_key:
-            raise ValueError("GEMINI_API_KEY is required.")
-        genai.configure(api_key=self.api_key)
+        self.backend = llm_backend.get_backend(api_key)
         # Using the highest quality available Pro model for vision reasoning
-        self.model = genai.GenerativeModel('gemini-3-flash-preview')
+        self.model = self.backend.model('gemini-3-flash-preview')
         
         self.font_path = os.path.join(os.path.dirname(__file__), 'data', 'HackGen-Regular.ttf')
         self._ensure_font()
@@ -1,103 +1,567 @@
 import json
 import os
 import re
+import threading
+import contextlib
+from collections import OrderedDict
 from datetime import datetime
 
+import day_format
+
+try:
+    import fcntl
+except ImportError: # Windows: the in-process lock only
+    fcntl = None
+
 DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
 USERS_DIR = os.path.join(DATA_DIR, 'users')
 
+# 'json': one file per day under DATA_DIR (default)
+# 'sqlite': indexed paper store in DATA_DIR/papers.sqlite3 (see paper_store.py)
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "json")
+
+# Format new day files are written in (json backend):
+# 'json': DATA_DIR/YYYY-MM-DD.json (default)
+# 'compact': DATA_DIR/YYYY-MM-DD.dayz, per-paper compressed (see day_format.py)
+# Both are always readable; saving a day removes its file in the other format.
+DAY_FILE_FORMAT = os.environ.get("DAY_FILE_FORMAT", "json")
+
+_paper_stores = {}
+
+def _sqlite():
+    path = os.path.join(DATA_DIR, 'papers.sqlite3')
+    if path not in _paper_stores:
+        from paper_store import PaperStore
+        _paper_stores[path] = PaperStore(path)
+    return _paper_stores[path]
+
+# In-process LRU cache of parsed day files and of the date list (json
+# backend). Entries are validated against file mtime/size on every read and
+# against a counter bumped by this process's writes. The byte budget counts
+# the uncompressed JSON size of the cached days.
+DAY_CACHE_MAX_BYTES = int(os.environ.get("DAY_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+_cache_lock = threading.Lock()
+_day_cache = OrderedDict() # day file path -> (signature, papers, nbytes)
+_day_cache_bytes = 0
+_dates_cache = None # (signature, dates)
+_write_version = 0
+_cache_counters = {"hits": 0, "misses": 0, "evictions": 0, "dates_hits": 0, "dates_misses": 0}
+
+def _stat_signature(path):
+    try:
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+
+def _append_jsonl(path, records):
+    """Appends one JSON line per record and fsyncs, so a returned append is durable."""
+    lines = ''.join(json.dumps(r, ensure_ascii=False) + '\n' for r in records).encode('utf-8')
+    with open(path, 'ab+') as f:
+        # Start on a fresh line if a previous append was torn by a crash
+        if f.seek(0, os.SEEK_END) > 0:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b'\n':
+                lines = b'\n' + lines
+        f.write(lines)
+        f.flush()
+        os.fsync(f.fileno())
+
+def _read_jsonl(path):
+    """Yields the records of a file written by _append_jsonl; nothing if it does not exist."""
+    if not os.path.exists(path):
+        return
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue # Torn line from a crash mid-append
+
+def _bump_write_version():
+    global _write_version
+    with _cache_lock:
+        _write_version += 1
+
+def _cache_day(filepath, signature, data, nbytes):
+    global _day_cache_bytes
+    if nbytes > DAY_CACHE_MAX_BYTES:
+        return
+    with _cache_lock:
+        old = _day_cache.pop(filepath, None)
+        if old:
+            _day_cache_bytes -= old[2]
+        while _day_cache and _day_cache_bytes + nbytes > DAY_CACHE_MAX_BYTES:
+            _, (_, _, evicted_bytes) = _day_cache.popitem(last=False)
+            _day_cache_bytes -= evicted_bytes
+            _cache_counters['evictions'] += 1
+        _day_cache[filepath] = (signature, data, nbytes)
+        _day_cache_bytes += nbytes
+
+def cache_stats():
+    """Hit/miss counters and memory use of the day and date-list caches."""
+    with _cache_lock:
+        stats = dict(_cache_counters)
+        stats.update(entries=len(_day_cache), bytes=_day_cache_bytes, max_bytes=DAY_CACHE_MAX_BYTES)
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+    return stats
+
+def _day_path(date_str, fmt=None):
+    ext = day_format.EXTENSION if (fmt or DAY_FILE_FORMAT) == 'compact' else '.json'
+    return os.path.join(DATA_DIR, f"{date_str}{ext}")
+
+def _existing_day_path(date_str):
+    """The day's file in whichever format it was saved, or None."""
+    for fmt in ('compact', 'json'):
+        path = _day_path(date_str, fmt)
+        if os.path.exists(path):
+            return path
+    return None
+
+def _is_compact(path):
+    return path.endswith(day_format.EXTENSION)
+
+def _journal_path(date_str):
+    return os.path.join(DATA_DIR, f"{date_str}.journal.jsonl")
+
 def save_daily_data(data, date_str=None):
+    """
+    Writes the whole day file and folds away its update journal.
+    The file is replaced atomically, so a crash never leaves it half-written.
+    """
     if not os.path.exists(DATA_DIR):
         os.makedirs(DATA_DIR)
     
     if date_str is None:
         date_str = datetime.now().strftime('%Y-%m-%d')
+
+    if STORAGE_BACKEND == 'sqlite':
+        _sqlite().save_day(data, date_str)
+        print(f"Saved data for {date_str} to {_sqlite().db_path}")
+        return
     
-    filepath = os.path.join(DATA_DIR, f"{date_str}.json")
-    
-    with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    _bump_write_version()
+    filepath = _day_path(date_str)
+    if DAY_FILE_FORMAT == 'compact':
+        day_format.write_day(filepath, data)
+    else:
+        tmp_path = f"{filepath}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, filepath)
+
+    other_path = _day_path(date_str, 'json' if DAY_FILE_FORMAT == 'compact' else 'compact')
+    if os.path.exists(other_path):
+        os.remove(other_path)
+
+    journal_path = _journal_path(date_str)
+    if os.path.exists(journal_path):
+        os.remove(journal_path)
     
     print(f"Saved data to {filepath}")
 
+def append_daily_updates(papers, date_str):
+    """
+    Appends updated paper records to the day's journal (one JSON line each)
+    without rewriting the day file. load_daily_data applies the journal by
+    paper id; the next save_daily_data compacts it away.
+    """
+    if not papers:
+        return
+    if STORAGE_BACKEND == 'sqlite':
+        # Rows are updated in place; there is no journal
+        _sqlite().update_papers(papers, date_str)
+        return
+    _bump_write_version()
+    if not os.path.exists(DATA_DIR):
+        os.makedirs(DATA_DIR)
+    _append_jsonl(_journal_path(date_str), papers)
+
+def _apply_journal(data, date_str):
+    journal_path = _journal_path(date_str)
+    if not os.path.exists(journal_path):
+        return data
+    data = data or []
+    index = {p.get('id'): i for i, p in enumerate(data)}
+    for paper in _read_jsonl(journal_path):
+        pos = index.get(paper.get('id'))
+        if pos is None:
+            index[paper.get('id')] = len(data)
+            data.append(paper)
+        else:
+            data[pos] = paper
+    return data
+
 def load_daily_data(date_str):
-    filepath = os.path.join(DATA_DIR, f"{date_str}.json")
-    if not os.path.exists(filepath):
+    """
+    Returns the day's papers (journal applied), or None. Served from the
+    day cache while the day file and journal are unchanged; callers get
+    shallow copies of the paper dicts, so they may modify them freely.
+    """
+    if STORAGE_BACKEND == 'sqlite':
+        return _sqlite().load_day(date_str)
+    filepath = _existing_day_path(date_str) or _day_path(date_str)
+    file_sig = _stat_signature(filepath)
+    journal_sig = _stat_signature(_journal_path(date_str))
+    signature = (file_sig, journal_sig, _write_version)
+
+    with _cache_lock:
+        entry = _day_cache.get(filepath)
+        if entry and entry[0] == signature:
+            _day_cache.move_to_end(filepath)
+            _cache_counters['hits'] += 1
+            return [dict(p) for p in entry[1]]
+        _cache_counters['misses'] += 1
+
+    data, nbytes = _read_day(filepath, file_sig, journal_sig, date_str)
+    if data is None:
         return None
-    
-    with open(filepath, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    _cache_day(filepath, signature, data, nbytes)
+    return [dict(p) for p in data]
+
+def _read_day(filepath, file_sig, journal_sig, date_str):
+    """Parses the day file (either format) and applies the journal; returns (papers or None, nbytes)."""
+    data = None
+    nbytes = journal_sig[1] if journal_sig else 0
+    if file_sig is not None and _is_compact(filepath):
+        day = day_format.DayFile(filepath)
+        data = day.read_all()
+        nbytes += day.raw_bytes
+    elif file_sig is not None:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        nbytes += file_sig[1]
+    return _apply_journal(data, date_str), nbytes
+
+def _lazy_day(date_str):
+    """
+    The day's DayFile when single papers can be read without loading the
+    whole day: json backend, compact file, no pending journal. Else None.
+    """
+    if STORAGE_BACKEND == 'sqlite' or os.path.exists(_journal_path(date_str)):
+        return None
+    filepath = _existing_day_path(date_str)
+    if filepath is None or not _is_compact(filepath):
+        return None
+    return day_format.DayFile(filepath)
+
+def load_paper(date_str, paper_id):
+    """
+    Returns one paper of the day, or None. Reads and decompresses only that
+    paper's record when the day is stored in the compact format.
+    """
+    day = _lazy_day(date_str)
+    if day is not None:
+        return day.get(paper_id)
+    for p in load_daily_data(date_str) or []:
+        if p.get('id') == paper_id:
+            return p
+    return None
+
+def load_papers_page(date_str, offset=0, limit=20):
+    """
+    Returns (papers[offset:offset + limit], total paper count) for the day,
+    or (None, 0) if there is no data. Compact days decode only that page.
+    """
+    day = _lazy_day(date_str)
+    if day is not None:
+        return day.page(offset, limit), len(day)
+    data = load_daily_data(date_str)
+    if data is None:
+        return None, 0
+    offset = max(offset, 0)
+    return data[offset:offset + max(limit, 0)], len(data)
+
+def _dates_signature():
+    # Adding or removing a day file changes the directory's mtime
+    dir_sig = _stat_signature(DATA_DIR)
+    return (DATA_DIR, dir_sig, _write_version) if dir_sig else None
 
 def get_available_dates():
-    if not os.path.exists(DATA_DIR):
+    global _dates_cache
+    if STORAGE_BACKEND == 'sqlite':
+        return _sqlite().available_dates()
+    signature = _dates_signature()
+    if signature is None:
         return []
+
+    with _cache_lock:
+        if _dates_cache and _dates_cache[0] == signature:
+            _cache_counters['dates_hits'] += 1
+            return list(_dates_cache[1])
+        _cache_counters['dates_misses'] += 1
     
-    # Filter for YYYY-MM-DD.json format and ensure it's a file
-    date_pattern = re.compile(r'^\d{4}-\d{2}-\d{2}\.json$')
-    
-    files = [f for f in os.listdir(DATA_DIR) 
-             if date_pattern.match(f) and os.path.isfile(os.path.join(DATA_DIR, f))]
+    # Filter for YYYY-MM-DD.json / .dayz and ensure it's a file
+    date_pattern = re.compile(r'^(\d{4}-\d{2}-\d{2})(\.json|' + re.escape(day_format.EXTENSION) + ')$')
     
-    dates = [f.replace('.json', '') for f in files]
-    dates.sort(reverse=True)
-    return dates
+    dates = {m.group(1) for m in map(date_pattern.match, os.listdir(DATA_DIR))
+             if m and os.path.isfile(os.path.join(DATA_DIR, m.group(0)))}
+    dates = sorted(dates, reverse=True)
+    with _cache_lock:
+        _dates_cache = (signature, dates)
+    return list(dates)
 
-def _get_user_favorites_file(username):
+def get_paper(paper_id):
+    """
+    Returns the stored record of one paper, or None. An index lookup with
+    the sqlite backend; the json backend has to scan the day files.
+    """
+    if STORAGE_BACKEND == 'sqlite':
+        return _sqlite().get_paper(paper_id)
+    date_str = _paper_date_index().get(paper_id)
+    return load_paper(date_str, paper_id) if date_str else None
+
+# id -> date of every paper in the day files (json backend), so a paper can be
+# found without scanning the days. Validated against the date-list signature;
+# on a change only days whose files changed are re-read, bypassing the day cache.
+_paper_dates = None # (dates signature, {id: date})
+_paper_index_days = {} # date -> ((file sig, journal sig), ids)
+
+def _day_ids(date_str, filepath, file_sig, journal_sig):
+    day = _lazy_day(date_str)
+    if day is not None:
+        return day.ids
+    with _cache_lock:
+        entry = _day_cache.get(filepath)
+        if entry and entry[0] == (file_sig, journal_sig, _write_version):
+            return [p.get('id') for p in entry[1]]
+    data, _ = _read_day(filepath, file_sig, journal_sig, date_str)
+    return [p.get('id') for p in data or []]
+
+def _paper_date_index():
+    global _paper_dates
+    signature = _dates_signature()
+    with _cache_lock:
+        if _paper_dates and _paper_dates[0] == signature:
+            return _paper_dates[1]
+    index = {}
+    dates = get_available_dates()
+    # Oldest first, so a paper listed on several days maps to the newest one
+    for date_str in reversed(dates):
+        filepath = _existing_day_path(date_str) or _day_path(date_str)
+        file_sig = _stat_signature(filepath)
+        journal_sig = _stat_signature(_journal_path(date_str))
+        entry = _paper_index_days.get(date_str)
+        if not entry or entry[0] != (file_sig, journal_sig):
+            entry = _paper_index_days[date_str] = ((file_sig, journal_sig),
+                                                   _day_ids(date_str, filepath, file_sig, journal_sig))
+        for paper_id in entry[1]:
+            index[paper_id] = date_str
+    for date_str in set(_paper_index_days) - set(dates):
+        _paper_index_days.pop(date_str, None)
+    with _cache_lock:
+        _paper_dates = (signature, index)
+    return index
+
+# Favorites (json backend): favorites.json is a snapshot (newest first) and
+# every change since is one line in favorites.log.jsonl, appended under a
+# per-user lock. Once the log holds FAVORITES_COMPACT_OPS lines it is folded
+# into a new snapshot in the background.
+FAVORITES_COMPACT_OPS = int(os.environ.get("FAVORITES_COMPACT_OPS", "200"))
+
+_user_locks = {}
+_user_locks_guard = threading.Lock()
+_favorite_states = {} # user dir -> _FavoritesState
+_compacting = set()
+
+# A favorite is stored as a reference; its content comes from the day data.
+# Title and URL are kept too, for display if the paper can no longer be found.
+FAVORITE_REF_FIELDS = ('id', 'list_date', 'saved_at')
+FAVORITE_FALLBACK_FIELDS = ('title', 'url')
+
+def _favorite_ref(paper):
+    return {k: paper[k] for k in FAVORITE_REF_FIELDS + FAVORITE_FALLBACK_FIELDS if paper.get(k)}
+
+def _merge_favorite(paper, favorite):
+    merged = dict(paper)
+    merged.update({k: favorite[k] for k in FAVORITE_REF_FIELDS if favorite.get(k)})
+    return merged
+
+def _lookup_favorite_papers(favorites):
+    """
+    Returns the day-data record for each favorite (None if not found),
+    loading each list date's day once. Favorites not in their list date's
+    day are located through the paper id index, never by scanning days.
+    """
+    days = {}
+    for date_str in {fav['list_date'] for fav in favorites if fav.get('list_date')}:
+        days[date_str] = {p.get('id'): p for p in load_daily_data(date_str) or []}
+    papers = [days.get(fav.get('list_date'), {}).get(fav.get('id')) for fav in favorites]
+
+    unresolved = [i for i, paper in enumerate(papers) if paper is None]
+    index = _paper_date_index() if unresolved else {}
+    for i in unresolved:
+        paper_id = favorites[i].get('id')
+        if paper_id in index:
+            papers[i] = load_paper(index[paper_id], paper_id)
+    return papers
+
+def _resolve_favorites(favorites):
+    """Favorites with their paper content filled in; legacy full records whose paper is gone stay as stored."""
+    return [_merge_favorite(paper, fav) if paper else dict(fav)
+            for fav, paper in zip(favorites, _lookup_favorite_papers(favorites))]
+
+class _FavoritesState:
+    def __init__(self, signature, favorites, log_ops):
+        self.signature = signature # (snapshot stat, log stat)
+        self.favorites = favorites # id -> paper, oldest first
+        self.log_ops = log_ops
+
+def _user_dir(username):
     user_dir = os.path.join(USERS_DIR, username)
     if not os.path.exists(user_dir):
         os.makedirs(user_dir)
-    return os.path.join(user_dir, 'favorites.json')
+    return user_dir
+
+def _get_user_favorites_file(username):
+    return os.path.join(_user_dir(username), 'favorites.json')
+
+def _favorites_log_file(username):
+    return os.path.join(_user_dir(username), 'favorites.log.jsonl')
+
+@contextlib.contextmanager
+def _favorites_lock(username):
+    """Per-user lock: a thread lock, plus flock on a lock file for other processes."""
+    user_dir = _user_dir(username)
+    with _user_locks_guard:
+        lock = _user_locks.setdefault(user_dir, threading.Lock())
+    with lock, open(os.path.join(user_dir, 'favorites.lock'), 'a') as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def _favorites_signature(username):
+    return (_stat_signature(_get_user_favorites_file(username)), _stat_signature(_favorites_log_file(username)))
+
+def _apply_favorite_op(favorites, op):
+    """Applies one log operation to an id -> paper dict; returns whether anything changed."""
+    kind = op.get('op')
+    if kind == 'add':
+        paper = op['paper']
+        if paper.get('id') in favorites:
+            return False
+        favorites[paper.get('id')] = paper
+        return True
+    if kind == 'del':
+        return favorites.pop(op.get('id'), None) is not None
+    if kind == 'del_date':
+        doomed = [pid for pid, p in favorites.items() if p.get('saved_at', '').startswith(op['date'])]
+        for pid in doomed:
+            del favorites[pid]
+        return bool(doomed)
+    return False
+
+def _read_favorites_files(snapshot, log_path):
+    """Returns (id -> paper oldest first, log op count) from a snapshot and its log."""
+    favorites = {}
+    if os.path.exists(snapshot):
+        with open(snapshot, 'r', encoding='utf-8') as f:
+            for paper in reversed(json.load(f)):
+                favorites.setdefault(paper.get('id'), paper)
+    log_ops = 0
+    for op in _read_jsonl(log_path):
+        _apply_favorite_op(favorites, op)
+        log_ops += 1
+    return favorites, log_ops
+
+def _read_favorites(username):
+    """Reads snapshot + log from disk. Call with the user's lock held."""
+    favorites, log_ops = _read_favorites_files(_get_user_favorites_file(username), _favorites_log_file(username))
+    return _FavoritesState(_favorites_signature(username), favorites, log_ops)
+
+def _favorites_state(username):
+    """
+    The user's favorites, re-read only when the files changed since last
+    time. Call with the user's lock held.
+    """
+    key = _user_dir(username)
+    state = _favorite_states.get(key)
+    if not state or state.signature != _favorites_signature(username):
+        state = _favorite_states[key] = _read_favorites(username)
+    return state
+
+def _append_favorite_op(username, op):
+    """Applies `op` and appends it to the log atomically; returns whether it changed anything."""
+    with _favorites_lock(username):
+        state = _favorites_state(username)
+        # The cached state only takes the change once it is on disk
+        favorites = dict(state.favorites)
+        if not _apply_favorite_op(favorites, op):
+            return False
+        _append_jsonl(_favorites_log_file(username), [op])
+        state.favorites = favorites
+        state.log_ops += 1
+        state.signature = _favorites_signature(username)
+        compact = state.log_ops >= FAVORITES_COMPACT_OPS
+
+    if compact:
+        with _user_locks_guard:
+            if username in _compacting:
+                return True
+            _compacting.add(username)
+        threading.Thread(target=compact_favorites, args=(username,), daemon=True).start()
+    return True
+
+def compact_favorites(username):
+    """Folds the user's favorites log into a new snapshot."""
+    try:
+        with _favorites_lock(username):
+            favorites = list(_favorites_state(username).favorites.values())
+        # Day data is read outside the lock so saving favorites is not held up
+        resolved = {fav.get('id') for fav, paper in zip(favorites, _lookup_favorite_papers(favorites)) if paper}
+
+        with _favorites_lock(username):
+            state = _favorites_state(username)
+            snapshot = _get_user_favorites_file(username)
+            tmp_path = f"{snapshot}.tmp"
+            # Legacy full records whose paper is in the day data shrink to references
+            refs = [_favorite_ref(fav) if fav.get('id') in resolved else fav
+                    for fav in reversed(state.favorites.values())]
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(refs, f, ensure_ascii=False)
+            os.replace(tmp_path, snapshot)
+            state.favorites = {ref.get('id'): ref for ref in reversed(refs)}
+            log_path = _favorites_log_file(username)
+            if os.path.exists(log_path):
+                os.remove(log_path)
+            state.log_ops = 0
+            state.signature = _favorites_signature(username)
+    finally:
+        with _user_locks_guard:
+            _compacting.discard(username)
 
 def get_favorites(username):
-    filepath = _get_user_favorites_file(username)
-    if not os.path.exists(filepath):
-        return []
-    with open(filepath, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    if STORAGE_BACKEND == 'sqlite':
+        return _sqlite().get_favorites(username)
+    with _favorites_lock(username):
+        state = _favorites_state(username)
+        favorites = list(reversed(state.favorites.values()))
+    return _resolve_favorites(favorites)
 
 def save_favorite(username, paper):
-    favorites = get_favorites(username)
-    filepath = _get_user_favorites_file(username)
-    
-    # Check if already exists
-    for fav in favorites:
-        if fav.get('id') == paper.get('id'):
-            return False # Already exists
-            
+    """Saves a reference (id, list_date, saved_at); the content is read from the day data."""
     # Add timestamp
     paper['saved_at'] = datetime.now().isoformat()
-    favorites.insert(0, paper) # Add to top
-    
-    with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(favorites, f, ensure_ascii=False, indent=2)
-    return True
+    if STORAGE_BACKEND == 'sqlite':
+        return _sqlite().add_favorite(username, _favorite_ref(paper))
+    return _append_favorite_op(username, {"op": "add", "paper": _favorite_ref(paper)})
 
 def delete_favorite(username, paper_id):
-    favorites = get_favorites(username)
-    filepath = _get_user_favorites_file(username)
-    
-    original_len = len(favorites)
-    favorites = [p for p in favorites if p.get('id') != paper_id]
-    
-    if len(favorites) != original_len:
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(favorites, f, ensure_ascii=False, indent=2)
-        return True
-    return False
+    if STORAGE_BACKEND == 'sqlite':
+        return _sqlite().delete_favorite(username, paper_id)
+    return _append_favorite_op(username, {"op": "del", "id": paper_id})
 
 def delete_favorites_by_date(username, date_str):
     """
     date_str: 'YYYY-MM-DD'
     """
-    favorites = get_favorites(username)
-    filepath = _get_user_favorites_file(username)
-    
-    original_len = len(favorites)
+    if STORAGE_BACKEND == 'sqlite':
+        return _sqlite().delete_favorites_by_date(username, date_str)
     # saved_at is ISO format "2026-01-13T10:00:00..."
-    favorites = [p for p in favorites if not p.get('saved_at', '').startswith(date_str)]
-    
-    if len(favorites) != original_len:
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(favorites, f, ensure_ascii=False, indent=2)
-        return True
-    return False
+    return _append_favorite_op(username, {"op": "del_date", "date": date_str})
@@ -1,9 +1,14 @@
 import os
-import google.generativeai as genai
 import time
 import json
 import re
 import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from rate_limiter import TokenBucketLimiter, estimate_tokens
+import summary_cache
+import llm_backend
 
 # Configure logging
 LOG_DIR = os.path.join(os.path.dirname(__file__), 'logs')
@@ -16,32 +21,130 @@ logging.basicConfig(
     format='%(asctime)s [%(levelname)s] %(message)s'
 )
 
-def configure_genai():
-    api_key = os.environ.get("GEMINI_API_KEY")
-    if not api_key:
-        error_msg = "GEMINI_API_KEY environment variable not set."
-        logging.error(error_msg)
-        raise ValueError(error_msg)
-    genai.configure(api_key=api_key)
+# Sync summarization runs SUMMARY_CONCURRENCY requests in flight, paced by a
+# shared token bucket sized to the Gemini quota instead of fixed sleeps.
+SUMMARY_CONCURRENCY = int(os.environ.get("SUMMARY_CONCURRENCY", "4"))
+GEMINI_RPM = float(os.environ.get("GEMINI_RPM", "10"))
+GEMINI_TPM = float(os.environ.get("GEMINI_TPM", "250000"))
 
-def process_batch(model, batch_papers):
+# Batches are packed by estimated tokens (input + expected output) up to
+# SUMMARY_BATCH_TOKEN_BUDGET, with at most SUMMARY_MAX_BATCH_SIZE papers each.
+SUMMARY_BATCH_TOKEN_BUDGET = int(os.environ.get("SUMMARY_BATCH_TOKEN_BUDGET", "6000"))
+SUMMARY_MAX_BATCH_SIZE = int(os.environ.get("SUMMARY_MAX_BATCH_SIZE", "10"))
+OUTPUT_TOKENS_PER_PAPER = 400 # Japanese summary + contribution + JSON overhead
+PROMPT_OVERHEAD_TOKENS = 250
+
+# Backoff base (seconds) for failures that are not quota errors: 2, 4, 8, 16...
+TRANSIENT_RETRY_BASE_DELAY = float(os.environ.get("SUMMARY_RETRY_BASE_DELAY", "2"))
+
+class BatchPlanner:
     """
-    Processes a batch of papers using a single API call.
-    Returns a list of dictionaries with 'summary_ja' and 'contribution_ja'.
+    Hands out batches of papers packed by estimated tokens. When a response
+    comes back truncated or with the wrong number of entries, the target
+    batch size is halved for the batches planned after it.
+    Also keeps per-run stats on calls made versus papers processed.
     """
-    
+    def __init__(self, papers, token_budget=None, max_batch_size=None):
+        self.pending = deque(papers)
+        self.token_budget = token_budget or SUMMARY_BATCH_TOKEN_BUDGET
+        self.target_size = max_batch_size or SUMMARY_MAX_BATCH_SIZE
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.batches = 0
+        self.papers = 0
+        self.shrinks = []
+
+    @staticmethod
+    def paper_tokens(paper):
+        text = f"{paper.get('title', '')} {paper.get('abstract', '')}"
+        return estimate_tokens(text) + OUTPUT_TOKENS_PER_PAPER
+
+    def next_batch(self):
+        """Returns the next batch (possibly empty when nothing is left)."""
+        with self.lock:
+            batch = []
+            tokens = PROMPT_OVERHEAD_TOKENS
+            while self.pending and len(batch) < self.target_size:
+                cost = self.paper_tokens(self.pending[0])
+                if batch and tokens + cost > self.token_budget:
+                    break
+                batch.append(self.pending.popleft())
+                tokens += cost
+            if batch:
+                self.batches += 1
+                self.papers += len(batch)
+            return batch
+
+    def record_call(self):
+        with self.lock:
+            self.calls += 1
+
+    def record_malformed(self, reason, batch_size):
+        """Shrinks the target batch size after a truncated / mismatched response."""
+        with self.lock:
+            new_size = max(1, (min(self.target_size, batch_size) + 1) // 2)
+            if new_size < self.target_size:
+                logging.info(f"{reason} at batch size {batch_size}; shrinking target batch size {self.target_size} -> {new_size}")
+                self.target_size = new_size
+                self.shrinks.append(reason)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "calls": self.calls,
+                "batches": self.batches,
+                "papers": self.papers,
+                "papers_per_call": self.papers / self.calls if self.calls else 0.0,
+                "final_batch_size": self.target_size,
+                "shrinks": len(self.shrinks),
+            }
+
+# Stats of the most recent summarize_and_translate run (see BatchPlanner.stats)
+last_run_stats = {}
+
+def parse_retry_delay(error_str):
+    """Returns the retry delay (s) suggested by a Gemini error message, or None."""
+    # e.g. "Please retry in 17.185952805s."
+    match = re.search(r'retry in ([\d\.]+)s', error_str)
+    if match:
+        return float(match.group(1)) + 1.0 # Add 1s buffer
+    # Alternative format check: "seconds: 19"
+    match_sec = re.search(r'seconds: (\d+)', error_str)
+    if match_sec:
+        return float(match_sec.group(1)) + 2.0
+    return None
+
+def is_rate_limit_error(error_str):
+    return any(x in error_str for x in ('429', 'RESOURCE_EXHAUSTED', 'ResourceExhausted', 'quota', 'rate limit'))
+
+def get_model():
+    """Returns the summary model bound to the configured LLM backend."""
+    try:
+        backend = llm_backend.get_backend()
+    except ValueError as e:
+        logging.error(str(e))
+        raise
+    # Using the highest quality available Pro model
+    return backend.model('gemini-3-flash-preview')
+
+def _is_truncated(response):
+    """True if generation stopped at the output token limit."""
+    return 'MAX_TOKENS' in str(getattr(response, 'finish_reason', None))
+
+def _build_prompt(batch_papers):
     papers_text = ""
     for i, paper in enumerate(batch_papers):
         papers_text += f"--- PAPER {i+1} ---\n"
         papers_text += f"Title: {paper.get('title', '')}\n"
         papers_text += f"Abstract: {paper.get('abstract', '')}\n\n"
 
-    prompt = f"""
+    return f"""
     You are an expert researcher. Please read the following {len(batch_papers)} papers (titles and abstracts) and provide a Japanese summary for each.
 
     For each paper, extract:
-    1. "summary_ja": A concise summary of the abstract in Japanese.
-    2. "contribution_ja": A one-sentence statement of the main contribution in Japanese.
+    1. "index": The number of the paper as given in its "--- PAPER n ---" header.
+    2. "summary_ja": A concise summary of the abstract in Japanese.
+    3. "contribution_ja": A one-sentence statement of the main contribution in Japanese.
 
     Input Data:
     {papers_text}
@@ -51,109 +154,257 @@ def process_batch(model, batch_papers):
     Do not include markdown formatting (like ```json). Just the raw JSON string.
     Example structure:
     [
-        {{"summary_ja": "...", "contribution_ja": "..."}},
-        {{"summary_ja": "...", "contribution_ja": "..."}}
+        {{"index": 1, "summary_ja": "...", "contribution_ja": "..."}},
+        {{"index": 2, "summary_ja": "...", "contribution_ja": "..."}}
     ]
     """
 
+def _salvage_objects(text):
+    """Decodes every well-formed top-level JSON object found in `text`."""
+    decoder = json.JSONDecoder()
+    objects = []
+    pos = text.find('{')
+    while pos != -1:
+        try:
+            obj, end = decoder.raw_decode(text, pos)
+        except ValueError:
+            pos = text.find('{', pos + 1)
+            continue
+        if isinstance(obj, dict):
+            objects.append(obj)
+        pos = text.find('{', end)
+    return objects
+
+def parse_batch_response(text, count):
+    """
+    Matches a (possibly malformed) model response to the `count` input papers.
+    Returns (matched, complete) where matched maps 0-based paper position to
+    its result dict and complete is True for a well-formed array of the
+    expected length.
+    """
+    text = text.strip()
+    # Clean up potential markdown code blocks if the model adds them
+    if text.startswith("```json"):
+        text = text[7:]
+    if text.startswith("```"):
+        text = text[3:]
+    if text.endswith("```"):
+        text = text[:-3]
+
+    try:
+        results = json.loads(text.strip())
+        complete = isinstance(results, list) and len(results) == count
+        if not isinstance(results, list):
+            results = [results]
+    except ValueError:
+        results = _salvage_objects(text)
+        complete = False
+
+    # Positions are those of the original array, so skip invalid entries in place
+    entries = []
+    for pos, res in enumerate(results):
+        if not isinstance(res, dict) or not res.get('summary_ja'):
+            continue
+        index = res.get('index')
+        if isinstance(index, str) and index.strip().isdigit():
+            index = int(index)
+        entries.append((pos, index if isinstance(index, int) else None, res))
+
+    indexes = [index for _, index, _ in entries]
+    if complete:
+        # A full array is matched by its indexes only if they are exactly
+        # 1..n (e.g. not 0-based); otherwise it lines up by position
+        by_index = sorted(i for i in indexes if i is not None) == list(range(1, count + 1))
+    else:
+        # A partial response has only its indexes to go by; a 0 means they
+        # are numbered differently, so none of them can be trusted
+        by_index = 0 not in indexes
+
+    matched = {}
+    for pos, index, res in entries:
+        if by_index and index is not None and 1 <= index <= count:
+            matched.setdefault(index - 1, res)
+        elif complete and not by_index:
+            matched.setdefault(pos, res)
+    return matched, complete and len(matched) == count
+
+def process_batch(model, batch_papers, limiter=None, planner=None):
+    """
+    Processes a batch of papers, normally with a single API call.
+    Returns a list aligned with batch_papers holding a dict with 'summary_ja'
+    and 'contribution_ja' per paper, or None for papers that failed.
+    Entries are matched to papers by their echoed index, so a response with
+    missing or malformed entries keeps what it can; only the missing papers
+    are requested again, and a subset that keeps failing is split in half
+    until the bad paper is isolated.
+    `limiter` (TokenBucketLimiter) paces the calls when batches run concurrently.
+    `planner` (BatchPlanner) is told about every call and malformed response.
+    """
+    return _process_subset(model, batch_papers, limiter, planner, is_top=True)
+
+def _process_subset(model, papers, limiter, planner, is_top=False):
+    results = [None] * len(papers)
+    missing = list(range(len(papers)))
+    shrink_reported = False
+
     max_retries = 5 # Increased for free tier
     for attempt in range(max_retries):
+        subset = [papers[i] for i in missing]
+        prompt = _build_prompt(subset)
+        text = None
         try:
-            logging.info(f"Generating content for batch (size {len(batch_papers)}), attempt {attempt+1}")
+            if limiter:
+                limiter.acquire(estimate_tokens(prompt))
+            logging.info(f"Generating content for batch (size {len(subset)}), attempt {attempt+1}")
+            if planner:
+                planner.record_call()
             response = model.generate_content(prompt)
-            text = response.text.strip()
-            
-            # Clean up potential markdown code blocks if the model adds them
-            if text.startswith("```json"):
-                text = text[7:]
-            if text.startswith("```"):
-                text = text[3:]
-            if text.endswith("```"):
-                text = text[:-3]
-            
-            results = json.loads(text.strip())
-            
-            if not isinstance(results, list) or len(results) != len(batch_papers):
-                 logging.error(f"Invalid JSON structure or length mismatch. Expected {len(batch_papers)}, got {len(results) if isinstance(results, list) else 'type:' + str(type(results))}")
-                 raise ValueError(f"Expected list of length {len(batch_papers)}")
-                 
-            return results
-
+            text = response.text
+            matched, complete = parse_batch_response(text, len(subset))
+            if not complete:
+                reason = "Truncated response" if _is_truncated(response) else "Length mismatch"
+                logging.error(f"{reason}: matched {len(matched)} of {len(subset)} papers")
+                if planner and is_top and not shrink_reported:
+                    planner.record_malformed(reason, len(subset))
+                    shrink_reported = True
         except Exception as e:
             error_str = str(e)
             logging.warning(f"Batch processing error (attempt {attempt+1}): {error_str}")
-            
-            if attempt < max_retries - 1:
-                # Try to parse recommended retry delay from error message
-                # e.g. "Please retry in 17.185952805s."
+            delay = parse_retry_delay(error_str)
+            if delay is None and is_rate_limit_error(error_str):
                 delay = 10 * (2 ** attempt) # Default exponential backoff: 10, 20, 40, 80...
-                
-                match = re.search(r'retry in ([\d\.]+)s', error_str)
-                if match:
-                    delay = float(match.group(1)) + 1.0 # Add 1s buffer
-                    logging.info(f"Parsed recommended retry delay: {delay}s")
+            if delay is not None:
+                # Quota errors hold back every worker sharing the limiter
+                logging.info(f"Rate limited. Pausing requests for {delay}s before retry...")
+                if limiter:
+                    limiter.pause(delay)
                 else:
-                    # Alternative format check: "seconds: 19"
-                    match_sec = re.search(r'seconds: (\d+)', error_str)
-                    if match_sec:
-                        delay = float(match_sec.group(1)) + 2.0
-                        logging.info(f"Parsed recommended retry seconds: {delay}s")
-
+                    time.sleep(delay)
+                continue
+            if attempt < max_retries - 1:
+                # Server errors, timeouts, dropped connections: back off this worker only
+                delay = TRANSIENT_RETRY_BASE_DELAY * (2 ** attempt)
                 logging.info(f"Waiting {delay}s before retry...")
                 time.sleep(delay)
-            else:
-                logging.error(f"Failed to process batch after {max_retries} attempts.")
-                logging.error(f"Raw Response Text (if available): {text if 'text' in locals() else 'None'}")
-                return None
+            # Nothing came back to judge the papers by: retry the same subset
+            # rather than bisecting, which is only for malformed responses
+            continue
 
-    return None
+        for local_idx, res in matched.items():
+            results[missing[local_idx]] = res
+        still_missing = [missing[i] for i in range(len(missing)) if i not in matched]
+        if not still_missing:
+            return results
+
+        if len(still_missing) == len(missing) and len(missing) > 1:
+            # No progress on this subset: bisect to isolate the bad paper
+            half = len(missing) // 2
+            logging.info(f"No usable entries for {len(missing)} papers; splitting into {half} + {len(missing) - half}")
+            for part in (missing[:half], missing[half:]):
+                sub_results = _process_subset(model, [papers[i] for i in part], limiter, planner)
+                for i, res in zip(part, sub_results):
+                    results[i] = res
+            return results
+
+        # Partial progress (or a single paper): re-request only what is missing
+        logging.info(f"Re-requesting {len(still_missing)} missing papers")
+        missing = still_missing
+
+    logging.error(f"Failed to process {len(missing)} papers after {max_retries} attempts.")
+    logging.error(f"Raw Response Text (if available): {text}")
+    return results
 
-def summarize_and_translate(papers, batch_size=5):
+def _summarize_batch(model, batch, limiter, planner):
+    """Summarizes one batch in place."""
+    results = process_batch(model, batch, limiter, planner)
+
+    for p, res in zip(batch, results):
+        if res:
+            p['summary_ja'] = res.get('summary_ja', 'Error')
+            p['contribution_ja'] = res.get('contribution_ja', 'Error')
+            summary_cache.store(p)
+        else:
+            # Fallback: Mark as error if the paper could not be summarized
+            p['summary_ja'] = "要約生成エラー"
+            p['contribution_ja'] = "-"
+            logging.error(f"Marked paper {p.get('id')} as Error due to batch failure")
+    return batch
+
+def iter_summaries(papers, batch_size=None, concurrency=None, token_budget=None):
+    """
+    Generator form of summarize_and_translate: summarizes `papers` in place
+    and yields each group of papers as soon as its fields are final (papers
+    without an abstract, summary-cache hits, then every finished batch), so
+    the caller can checkpoint results while the run is still going.
+    Batches are packed by estimated tokens up to `token_budget` with at most
+    `batch_size` papers each (see BatchPlanner). Up to `concurrency` batches
+    (default SUMMARY_CONCURRENCY) are in flight at once, paced by a shared
+    GEMINI_RPM / GEMINI_TPM token bucket.
+    """
+    global last_run_stats
+    model = get_model()
+    limiter = TokenBucketLimiter(GEMINI_RPM, GEMINI_TPM)
+    concurrency = SUMMARY_CONCURRENCY if concurrency is None else concurrency
+
+    # Filter out papers with no abstract to avoid wasting tokens
+    valid_papers = []
+    skipped = []
+    for p in papers:
+        if p.get('abstract'):
+            valid_papers.append(p)
+        else:
+            p['summary_ja'] = "要約不可 (アブストラクトなし)"
+            skipped.append(p)
+            logging.info(f"Skipping paper {p.get('id')} (No abstract)")
+    if skipped:
+        yield skipped
+
+    # Only papers missing from the shared summary cache go to the API
+    pending = summary_cache.apply_cached(valid_papers, source='sync')
+    pending_ids = {id(p) for p in pending}
+    cached = [p for p in valid_papers if id(p) not in pending_ids]
+    if cached:
+        yield cached
+
+    planner = BatchPlanner(pending, token_budget=token_budget, max_batch_size=batch_size)
+    start = time.time()
+
+    # Batches are planned lazily so a shrink applies to everything not yet sent
+    with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as executor:
+        in_flight = set()
+        done_papers = 0
+        while True:
+            while len(in_flight) < max(concurrency, 1):
+                batch = planner.next_batch()
+                if not batch:
+                    break
+                in_flight.add(executor.submit(_summarize_batch, model, batch, limiter, planner))
+            if not in_flight:
+                break
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                batch = future.result()
+                done_papers += len(batch)
+                yield batch
+            print(f"Processed {done_papers}/{len(pending)} papers")
+
+    stats = planner.stats()
+    stats["elapsed"] = time.time() - start
+    stats["rate_limit_wait"] = limiter.waited
+    last_run_stats = stats
+    summary = (f"Summarized {stats['papers']} papers with {stats['calls']} calls in {stats['batches']} batches "
+               f"({stats['papers_per_call']:.1f} papers/call, final batch size {stats['final_batch_size']}, "
+               f"{stats['shrinks']} shrinks) in {stats['elapsed']:.1f}s, {stats['rate_limit_wait']:.1f}s waiting on rate limits")
+    logging.info(summary)
+    print(summary)
+
+def summarize_and_translate(papers, batch_size=None, concurrency=None, token_budget=None):
     """
     Takes a list of paper dictionaries.
     Returns the list with added 'summary_ja' and 'contribution_ja' keys.
-    Processes in batches to reduce API calls.
+    Processes in batches to reduce API calls (see iter_summaries for the
+    batching and concurrency options). Output order matches input order.
     """
-    configure_genai()
-    # Using the highest quality available Pro model
-    model = genai.GenerativeModel('gemini-3-flash-preview')
-
-    processed_papers = []
-    
-    # Create batches
-    for i in range(0, len(papers), batch_size):
-        batch = papers[i:i + batch_size]
-        logging.info(f"Processing batch {i//batch_size + 1} (Papers {i+1}-{min(i+batch_size, len(papers))})...")
-        print(f"Processing batch {i//batch_size + 1} (Papers {i+1}-{min(i+batch_size, len(papers))})...")
-        
-        # Filter out papers with no abstract to avoid wasting tokens
-        valid_indices = []
-        clean_batch = []
-        for idx, p in enumerate(batch):
-            if p.get('abstract'):
-                valid_indices.append(idx)
-                clean_batch.append(p)
-            else:
-                p['summary_ja'] = "要約不可 (アブストラクトなし)"
-                logging.info(f"Skipping paper {p.get('id')} (No abstract)")
-        
-        if clean_batch:
-            results = process_batch(model, clean_batch)
-            
-            if results:
-                for v_idx, res in zip(valid_indices, results):
-                    batch[v_idx]['summary_ja'] = res.get('summary_ja', 'Error')
-                    batch[v_idx]['contribution_ja'] = res.get('contribution_ja', 'Error')
-            else:
-                # Fallback: Mark as error if batch failed
-                for v_idx in valid_indices:
-                     batch[v_idx]['summary_ja'] = "要約生成エラー"
-                     batch[v_idx]['contribution_ja'] = "-"
-                     logging.error(f"Marked paper {batch[v_idx].get('id')} as Error due to batch failure")
-        
-        processed_papers.extend(batch)
-        
-        # Respect rate limits - Increased for free tier
-        time.sleep(5.0)
-
-    return processed_papers
+    for _ in iter_summaries(papers, batch_size, concurrency, token_budget):
+        pass
+    return list(papers)
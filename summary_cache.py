@@ -0,0 +1,140 @@
+"""
+Content-addressed cache of paper summaries, shared by the synchronous path
+(summarizer.summarize_and_translate) and the Batch API path
+(BatchProcessor.submit_summary_batch / process_completed_jobs).
+
+    python summary_cache.py stats
+    python summary_cache.py invalidate <prompt_version>
+"""
+import os
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import logging
+from disk_cache import DiskCache
+
+CACHE_DIR = os.path.join(os.path.dirname(__file__), 'data', 'summary_cache')
+CACHE_MAX_BYTES = int(os.environ.get("SUMMARY_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+
+# Bump whenever either summary prompt changes in a way that changes the
+# output, so old summaries stop matching. Each version has its own directory.
+PROMPT_VERSION = "summary-v2"
+MODEL = "gemini-3-flash-preview"
+
+# Markers written on failure; never cached
+ERROR_VALUES = {"要約生成エラー", "要約不可 (アブストラクトなし)", "パースエラー", "Error"}
+
+_caches = {}
+
+def get_cache(prompt_version=PROMPT_VERSION):
+    if prompt_version not in _caches:
+        _caches[prompt_version] = DiskCache(os.path.join(CACHE_DIR, prompt_version), max_bytes=CACHE_MAX_BYTES)
+    return _caches[prompt_version]
+
+def summary_key(paper, model=MODEL, prompt_version=PROMPT_VERSION):
+    content = json.dumps([paper.get('title', ''), paper.get('abstract', ''), prompt_version, model], ensure_ascii=False)
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+def is_valid_summary(summary_ja):
+    return bool(summary_ja) and str(summary_ja).strip() != "" and summary_ja not in ERROR_VALUES
+
+def lookup(paper, model=MODEL, prompt_version=PROMPT_VERSION):
+    """Returns {'summary_ja', 'contribution_ja'} for a cached paper, or None."""
+    return get_cache(prompt_version).get(summary_key(paper, model, prompt_version))
+
+def store(paper, model=MODEL, prompt_version=PROMPT_VERSION):
+    """Caches the paper's summary fields if they hold a real summary."""
+    if not is_valid_summary(paper.get('summary_ja')):
+        return False
+    get_cache(prompt_version).put(summary_key(paper, model, prompt_version), {
+        "summary_ja": paper['summary_ja'],
+        "contribution_ja": paper.get('contribution_ja', ''),
+    })
+    return True
+
+def apply_cached(papers, source, model=MODEL, prompt_version=PROMPT_VERSION):
+    """
+    Fills 'summary_ja' / 'contribution_ja' in place for every cached paper.
+    Returns the papers that still need an API call. `source` ('sync' or
+    'batch') is recorded with the hit counts in the version's stats log.
+    """
+    misses = []
+    for p in papers:
+        cached = lookup(p, model, prompt_version)
+        if cached:
+            p['summary_ja'] = cached.get('summary_ja')
+            p['contribution_ja'] = cached.get('contribution_ja', '')
+        else:
+            misses.append(p)
+
+    hits = len(papers) - len(misses)
+    if papers:
+        logging.info(f"Summary cache ({source}): {hits} hits, {len(misses)} misses")
+        print(f"Summary cache: {hits}/{len(papers)} papers served from cache.")
+        _record_stats(prompt_version, source, hits, len(misses))
+    return misses
+
+def _record_stats(prompt_version, source, hits, misses):
+    directory = os.path.join(CACHE_DIR, prompt_version)
+    os.makedirs(directory, exist_ok=True)
+    line = json.dumps({"time": time.time(), "source": source, "hits": hits, "misses": misses})
+    with open(os.path.join(directory, 'stats.jsonl'), 'a', encoding='utf-8') as f:
+        f.write(line + '\n')
+
+def stats():
+    """Cumulative hit/miss counts per prompt version and source."""
+    result = {}
+    if not os.path.exists(CACHE_DIR):
+        return result
+    for version in sorted(os.listdir(CACHE_DIR)):
+        path = os.path.join(CACHE_DIR, version, 'stats.jsonl')
+        if not os.path.exists(path):
+            continue
+        per_source = {}
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue
+                counts = per_source.setdefault(rec['source'], {"hits": 0, "misses": 0})
+                counts['hits'] += rec['hits']
+                counts['misses'] += rec['misses']
+        result[version] = per_source
+    return result
+
+def invalidate(prompt_version):
+    """Drops every cached summary of `prompt_version`."""
+    directory = os.path.join(CACHE_DIR, prompt_version)
+    _caches.pop(prompt_version, None)
+    if not os.path.exists(directory):
+        return False
+    shutil.rmtree(directory)
+    return True
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('stats', help='Show cumulative hit rates per prompt version')
+    inv = sub.add_parser('invalidate', help='Delete all cached summaries of a prompt version')
+    inv.add_argument('prompt_version')
+    args = parser.parse_args()
+
+    if args.command == 'stats':
+        all_stats = stats()
+        if not all_stats:
+            print("Summary cache is empty.")
+        for version, per_source in all_stats.items():
+            marker = " (current)" if version == PROMPT_VERSION else ""
+            print(f"{version}{marker}")
+            for source, counts in per_source.items():
+                total = counts['hits'] + counts['misses']
+                rate = counts['hits'] / total if total else 0.0
+                print(f"  {source:<6} hits={counts['hits']} misses={counts['misses']} hit_rate={rate:.1%}")
+    else:
+        if invalidate(args.prompt_version):
+            print(f"Invalidated summary cache for {args.prompt_version}.")
+        else:
+            print(f"No cache found for {args.prompt_version}.")